@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -7,6 +7,7 @@ from app.core.security import decode_token
 from app.crud import user as user_crud
 from app.db.session import get_db
 from app.db.models.user import User, UserRole
+from app.services.bigquery_service import BigQueryService
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -70,4 +71,15 @@ def require_partner_or_admin(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Partner or admin access required"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+def get_bigquery_service(request: Request) -> BigQueryService:
+    """Process-wide BigQueryService created by the app lifespan."""
+    service = getattr(request.app.state, "bigquery_service", None)
+    if service is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="BigQuery service is not available"
+        )
+    return service
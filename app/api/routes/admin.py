@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app.api.deps import get_current_active_user, require_admin
+from app.core.metrics import metrics
 from app.crud import user as user_crud
 from app.db.session import get_db
 from app.schemas.user import (
@@ -119,3 +120,11 @@ def search_user_by_email(
         )
     return user
 
+
+
+@router.get("/metrics")
+def get_metrics(
+    current_user: User = Depends(require_admin)
+):
+    """Get in-process metrics for this instance, e.g. cache hit rates and timings (Admin only)."""
+    return metrics.snapshot()
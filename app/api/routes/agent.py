@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status, Body, Query
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status, Body, Query
 from typing import Optional, Any, Dict
 from sqlalchemy.orm import Session
 import json
 
 from app.api.deps import get_current_active_user, get_db  # or require_partner_or_admin if you want stricter access
+from app.core.deadline import DeadlineExceeded
 from app.services.agent_service import AgentService
+from app.utils.disconnect import cancel_on_disconnect
 import logging
 import time
 
@@ -25,6 +27,7 @@ def _parse_json_field(field_value: Optional[str], field_name: str) -> Optional[D
 
 @router.post("/run-session", summary="Run agent session with a PDF")
 async def run_session_with_pdf(
+    request: Request,
     user_id: str = Form(...),
     session_id: str = Form(...),
     file: Optional[UploadFile] = File(None),
@@ -61,7 +64,7 @@ async def run_session_with_pdf(
         agent_service = AgentService()
         logger.debug("AgentService base_url=%s timeout=%s", agent_service.base_url, agent_service.timeout)
 
-        result = await agent_service.run_session_with_pdf(
+        result = await cancel_on_disconnect(request, agent_service.run_session_with_pdf(
             user_id=user_id,
             session_id=session_id,
             file_bytes=file_bytes,
@@ -72,7 +75,7 @@ async def run_session_with_pdf(
             streaming=streaming,
             state_delta=state_delta_obj,
             session_bootstrap_payload=bootstrap_obj,
-        )
+        ))
         
         ## find empty fields and raise red flag
         # _raise_flags_from_result(result=result, company_id=int(user_id), db_session=agent_service.db_session)
@@ -88,6 +91,10 @@ async def run_session_with_pdf(
         # Already meaningful error; still log it with stack trace
         logger.exception("run-session HTTPException for user_id=%s session_id=%s", user_id, session_id)
         raise
+    except DeadlineExceeded:
+        # Left to the app's handler, which answers 504
+        logger.warning("run-session deadline exceeded after %.2fs", time.perf_counter() - start_ts)
+        raise
     except Exception as e:
         elapsed = time.perf_counter() - start_ts
         logger.exception("run-session failed in %.2fs: %s", elapsed, str(e))
@@ -110,6 +117,8 @@ async def benchmark_research(
         agent_service = AgentService()
         result = await agent_service.invoke_benchmark_research(payload, company_id, db)
         return result
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
@@ -130,6 +139,8 @@ async def benchmark_research_progress(
         agent_service = AgentService()
         result = await agent_service.get_benchmark_research_progress(research_id, company_id, db)
         return result
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
@@ -148,6 +159,8 @@ async def benchmark_research_report(
         agent_service = AgentService()
         result = await agent_service.get_benchmark_research_report(research_id)
         return result
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
@@ -168,6 +181,8 @@ async def dealnote_create_session(
         agent_service = AgentService()
         result = await agent_service.invoke_dealnote_session(user_id, session_id, {})
         return result
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
@@ -177,16 +192,31 @@ async def dealnote_create_session(
 
 @router.post("/dealnote/run", summary="Run Dealnote /run with payload")
 async def dealnote_run(
+    user_id: str = Query(..., description="Dealnote userId"),
+    session_id: str = Query(..., description="Dealnote sessionId"),
     payload: Dict[str, Any] = Body(..., description="Raw payload for Dealnote /run"),
+    company_id: Optional[int] = Query(None, description="CompanyInformation ID to store the dealnote on"),
+    force: bool = Query(False, description="Regenerate even if a dealnote for this payload is stored"),
+    db: Session = Depends(get_db),
     current_user=Depends(get_current_active_user),
 ):
     """
     Calls the Dealnote agent /run endpoint with the provided JSON payload.
+    If company_id is given, an identical payload returns the stored dealnote unless force=true.
     """
     try:
         agent_service = AgentService()
-        result = await agent_service.run_dealnote_app(payload)
+        result = await agent_service.run_dealnote_app(
+            user_id=user_id,
+            session_id=session_id,
+            payload=payload,
+            company_id=company_id,
+            db=db,
+            force=force,
+        )
         return result
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
@@ -199,11 +229,15 @@ async def dealnote_session_and_run(
     user_id: str = Query(..., description="Dealnote userId"),
     session_id: str = Query(..., description="Dealnote sessionId"),
     run_payload: Dict[str, Any] = Body(..., alias="runPayload", description="Payload for /run call"),
+    company_id: Optional[int] = Query(None, description="CompanyInformation ID to store the dealnote on"),
+    force: bool = Query(False, description="Regenerate even if a dealnote for this payload is stored"),
+    db: Session = Depends(get_db),
     current_user=Depends(get_current_active_user),
 ):
     """
     Convenience endpoint that first invokes the Dealnote session (with empty body) and then triggers /run.
     Expects a JSON body with key: { "runPayload": {...} }
+    If company_id is given, an identical runPayload returns the stored dealnote unless force=true.
     """
     try:
         agent_service = AgentService()
@@ -211,8 +245,13 @@ async def dealnote_session_and_run(
             user_id=user_id,
             session_id=session_id,
             run_payload=run_payload,
+            company_id=company_id,
+            db=db,
+            force=force,
         )
         return result
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
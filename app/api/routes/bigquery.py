@@ -1,12 +1,15 @@
 from typing import List, Dict, Any, Optional
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
+import pyarrow as pa
 import tempfile
 import os
+from app.api.deps import get_bigquery_service
 from app.services.bigquery_service import BigQueryService
 from app.schemas.startup import StartupCreate
 from app.db.models.startup import StartupStatus
 from app.core.config import settings
+from app.utils import arrow_format
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,28 +17,41 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/bigquery", tags=["BigQuery"])
 
+# format=json (default, cached) | ndjson | arrow (Arrow IPC stream, for analytics clients)
+OUTPUT_FORMAT_PATTERN = "^(json|ndjson|arrow)$"
+
+
+def _table_response(table: pa.Table, output_format: str) -> Response:
+    if output_format == "arrow":
+        return Response(arrow_format.to_ipc_stream(table), media_type=arrow_format.ARROW_STREAM_MEDIA_TYPE)
+    return Response(arrow_format.to_ndjson(table), media_type=arrow_format.NDJSON_MEDIA_TYPE)
+
+
 @router.get("/startups", response_model=List[Dict[str, Any]])
 async def get_startups(
     name: Optional[str] = None,
     status: Optional[StartupStatus] = None,
-    limit: int = Query(default=100, le=1000)
+    limit: int = Query(default=100, le=1000),
+    output_format: str = Query(default="json", alias="format", pattern=OUTPUT_FORMAT_PATTERN),
+    bq_service: BigQueryService = Depends(get_bigquery_service)
 ):
     """
-    Get startups with optional filters
+    Get startups with optional filters (raw_data is omitted from list results)
     """
     try:
-        bq_service = BigQueryService()
+        if output_format != "json":
+            table = await bq_service.fetch_startups_arrow(name=name, status=status, limit=limit)
+            return _table_response(table, output_format)
         return await bq_service.fetch_startups(name=name, status=status, limit=limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/startups/{startup_id}", response_model=Dict[str, Any])
-async def get_startup_by_id(startup_id: int):
+async def get_startup_by_id(startup_id: int, bq_service: BigQueryService = Depends(get_bigquery_service)):
     """
     Get a specific startup by ID
     """
     try:
-        bq_service = BigQueryService()
         startup = await bq_service.fetch_startup_by_id(startup_id)
         if not startup:
             raise HTTPException(status_code=404, detail="Startup not found")
@@ -44,23 +60,26 @@ async def get_startup_by_id(startup_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/startups/search", response_model=List[Dict[str, Any]])
-async def search_startups(search_params: Dict[str, Any]):
+async def search_startups(
+    search_params: Dict[str, Any], bq_service: BigQueryService = Depends(get_bigquery_service)
+):
     """
     Advanced search with multiple parameters
     """
     try:
-        bq_service = BigQueryService()
         return await bq_service.search_startups(search_params)
+    except ValueError as ve:
+        # Unknown column or wrongly typed value
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/startups", response_model=Dict[str, Any])
-async def ingest_startup(startup: StartupCreate):
+async def ingest_startup(startup: StartupCreate, bq_service: BigQueryService = Depends(get_bigquery_service)):
     """
     Ingest new startup data
     """
     try:
-        bq_service = BigQueryService()
         return await bq_service.ingest_startup_data(startup)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -185,14 +204,28 @@ async def get_document_analysis(
     founding_year_min: Optional[int] = Query(None, description="Minimum founding year"),
     founding_year_max: Optional[int] = Query(None, description="Maximum founding year"),
     company_stage: Optional[str] = Query(None, description="Filter by company stage (prefix match)"),
-    limit: int = Query(default=100, le=1000, description="Max number of records to fetch")
+    limit: int = Query(default=100, le=1000, description="Max number of records to fetch"),
+    output_format: str = Query(
+        default="json", alias="format", pattern=OUTPUT_FORMAT_PATTERN,
+        description="json, ndjson, or arrow (Arrow IPC stream)"
+    ),
+    bq_service: BigQueryService = Depends(get_bigquery_service)
 ):
     """
     Get document analysis records from BigQuery with optional filters.
     Supports prefix search for company_name, industry, and company_stage.
     """
     try:
-        bq_service = BigQueryService()
+        if output_format != "json":
+            table = await bq_service.fetch_document_analysis_arrow(
+                company_name=company_name,
+                industry=industry,
+                founding_year_min=founding_year_min,
+                founding_year_max=founding_year_max,
+                company_stage=company_stage,
+                limit=limit
+            )
+            return _table_response(table, output_format)
         return await bq_service.fetch_document_analysis(
             company_name=company_name,
             industry=industry,
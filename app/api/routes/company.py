@@ -1,15 +1,23 @@
 from app.api.constants.flag_constants import FRIENDLY_NAMES
 from app.schemas.flag import CompanyWithFlags
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Body
 from fastapi.params import Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from app.db.models.flag import CompanyFlag
 
 from app.api.deps import get_current_active_user, require_partner_or_admin
 from app.crud import company as company_crud
-from app.db.session import get_db
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded
+from app.db.session import SessionLocal, get_db
 from app.schemas.company import (
+    CompanyBatchSearchRequest,
+    CompanyBatchSearchResult,
     CompanyInformationCreate,
     CompanySearchRequest,
     CompanySearchResponse,
@@ -18,6 +26,10 @@ from app.schemas.company import (
 )
 from app.db.models.user import User
 from app.services.google_ai_service import google_ai_service
+from app.utils.disconnect import cancel_on_disconnect
+from app.utils.text import normalize_key
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/company", tags=["company"])
 
@@ -113,6 +125,7 @@ def create_company_info(
 
 @router.post("/search", response_model=CompanySearchResponse, status_code=status.HTTP_201_CREATED)
 async def search_company_information(
+    request: Request,
     search_request: CompanySearchRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_partner_or_admin)
@@ -131,20 +144,52 @@ async def search_company_information(
         
         # Check for rate limiting (optional - you can adjust the limits)
         recent_searches = company_crud.get_recent_searches_count(db, current_user.id, hours=1)
-        if recent_searches >= 10:  # Limit to 10 searches per hour per user
+        if recent_searches >= settings.COMPANY_SEARCH_HOURLY_LIMIT:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded. Maximum 10 searches per hour allowed."
+                detail=f"Rate limit exceeded. Maximum {settings.COMPANY_SEARCH_HOURLY_LIMIT} searches per hour allowed."
             )
         
+        # Check the shared profile store first: any user's search in the last 24 hours
+        shared_profile = company_crud.get_recent_company_profile(
+            db, search_request.company_name, search_request.search_query, hours=24
+        )
+        if shared_profile:
+            existing_search = company_crud.get_company_search_by_name(
+                db, search_request.company_name, current_user.id
+            )
+            if existing_search and existing_search.profile_hash == shared_profile.content_hash:
+                db_search = existing_search
+            else:
+                # Record the search for this user, referencing the shared profile
+                db_search = company_crud.create_company_search(
+                    db,
+                    CompanyInformationCreate(
+                        company_name=search_request.company_name,
+                        search_query=search_request.search_query
+                    ),
+                    current_user.id,
+                    profile_hash=shared_profile.content_hash
+                )
+            return CompanySearchResponse(
+                company_name=db_search.company_name,
+                information=shared_profile.profile,
+                search_timestamp=db_search.search_timestamp,
+                message=f"Returning cached information for {db_search.company_name}",
+                search_id=db_search.id
+            )
+
         # Check if we already have recent information for this company
         existing_search = company_crud.get_company_search_by_name(
             db, search_request.company_name, current_user.id
         )
         
-        # If we have a recent search (within last 24 hours), return cached result
-        if existing_search and existing_search.ai_generated_info:
-            from datetime import datetime, timedelta
+        # If we have a recent search (within last 24 hours) for the same query, return cached result
+        if (
+            existing_search
+            and existing_search.ai_generated_info
+            and normalize_key(existing_search.search_query) == normalize_key(search_request.search_query)
+        ):
             if existing_search.created_at > datetime.utcnow() - timedelta(hours=24):
                 return CompanySearchResponse(
                     company_name=existing_search.company_name,
@@ -155,7 +200,6 @@ async def search_company_information(
                 )
         
         # Create initial search record
-        from app.schemas.company import CompanyInformationCreate
         company_info_create = CompanyInformationCreate(
             company_name=search_request.company_name,
             search_query=search_request.search_query
@@ -166,14 +210,21 @@ async def search_company_information(
         )
         
         # Call Google AI service
-        ai_response = await google_ai_service.search_company_information(
+        ai_response = await cancel_on_disconnect(request, google_ai_service.search_company_information(
             search_request.company_name,
             search_request.search_query
-        )
+        ))
         
-        # Update the search record with AI response
+        # Store the profile once in the shared store and reference it from the search record
+        profile = company_crud.upsert_company_profile(
+            db,
+            search_request.company_name,
+            ai_response["information"],
+            ai_model=ai_response.get("ai_model"),
+            search_query=search_request.search_query
+        )
         updated_search = company_crud.update_company_search(
-            db, db_search.id, ai_response["information"]
+            db, db_search.id, {"profile_hash": profile.content_hash, "ai_generated_info": None}
         )
         
         return CompanySearchResponse(
@@ -184,7 +235,7 @@ async def search_company_information(
             search_id=updated_search.id
         )
         
-    except HTTPException:
+    except (HTTPException, DeadlineExceeded):
         raise
     except Exception as e:
         # Log the error and return a generic error response
@@ -193,6 +244,221 @@ async def search_company_information(
             detail=f"An error occurred while searching for company information: {str(e)}"
         )
 
+def _ndjson(result: CompanyBatchSearchResult) -> str:
+    return result.model_dump_json() + "\n"
+
+
+def _flush_batch_profiles(
+    db: Session,
+    completed: List[Tuple[int, str, Dict[str, Any], Optional[str]]],
+    search_query: Optional[str],
+) -> None:
+    """Store completed lookups as shared profiles and point their search rows at them, in two statements."""
+    if not completed:
+        return
+    hashes = company_crud.bulk_upsert_company_profiles(
+        db,
+        [
+            {"company_name": name, "profile": profile, "ai_model": ai_model}
+            for _, name, profile, ai_model in completed
+        ],
+        search_query=search_query,
+    )
+    company_crud.bulk_set_search_profiles(
+        db, {search_id: content_hash for (search_id, _, _, _), content_hash in zip(completed, hashes)}
+    )
+
+
+async def _stream_batch_search(
+    served: List[CompanyBatchSearchResult],
+    pending: List[Dict[str, Any]],
+    search_query: Optional[str],
+) -> AsyncIterator[str]:
+    for result in served:
+        yield _ndjson(result)
+    if not pending:
+        return
+
+    semaphore = asyncio.Semaphore(settings.COMPANY_BATCH_CONCURRENCY)
+
+    async def _lookup(search: Dict[str, Any]):
+        async with semaphore:
+            try:
+                return search, await google_ai_service.search_company_information(
+                    search["company_name"], search_query
+                ), None
+            except Exception as e:
+                return search, None, e
+
+    # The request-scoped session is closed before the body streams, so writes use their own
+    db = SessionLocal()
+    completed: List[Tuple[int, str, Dict[str, Any], Optional[str]]] = []
+    tasks = [asyncio.ensure_future(_lookup(search)) for search in pending]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            search, ai_response, error = await next_done
+            if error is not None:
+                detail = error.detail if isinstance(error, HTTPException) else str(error)
+                yield _ndjson(CompanyBatchSearchResult(
+                    company_name=search["company_name"],
+                    status="error",
+                    message=f"Failed to retrieve information for {search['company_name']}: {detail}",
+                    search_id=search["id"],
+                ))
+                continue
+
+            completed.append(
+                (search["id"], search["company_name"], ai_response["information"], ai_response.get("ai_model"))
+            )
+            if len(completed) >= settings.COMPANY_BATCH_WRITE_SIZE:
+                _flush_batch_profiles(db, completed, search_query)
+                completed = []
+
+            yield _ndjson(CompanyBatchSearchResult(
+                company_name=search["company_name"],
+                status="created",
+                information=ai_response["information"],
+                search_timestamp=search["search_timestamp"],
+                message=f"Successfully retrieved information for {search['company_name']}",
+                search_id=search["id"],
+            ))
+    finally:
+        # Client went away: stop lookups nobody will read, but keep what already came back
+        for task in tasks:
+            task.cancel()
+        try:
+            _flush_batch_profiles(db, completed, search_query)
+        except Exception:
+            logger.exception("Failed to store %d batch search results", len(completed))
+        finally:
+            db.close()
+
+
+@router.post("/search/batch")
+async def batch_search_company_information(
+    batch_request: CompanyBatchSearchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_partner_or_admin)
+):
+    """
+    Search for many companies at once (e.g. a pipeline import).
+    Requires partner or admin role.
+
+    Names are de-duplicated; companies with a profile from the last 24 hours are served
+    from the database, the rest are looked up concurrently. Those lookups count against
+    the hourly batch quota, and a batch that would exceed it is rejected. Streams one
+    CompanyBatchSearchResult per company as NDJSON, as each completes.
+    """
+    if not google_ai_service.validate_api_key():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Google AI service is not properly configured"
+        )
+
+    names: Dict[str, str] = {}
+    for raw_name in batch_request.company_names:
+        name = raw_name.strip()
+        if name:
+            names.setdefault(normalize_key(name), name)
+    if not names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No company names provided"
+        )
+    if len(names) > settings.COMPANY_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many companies. Maximum {settings.COMPANY_BATCH_MAX_SIZE} per batch allowed."
+        )
+
+    try:
+        profiles = company_crud.get_recent_company_profiles(
+            db, names.values(), batch_request.search_query, hours=24
+        )
+        existing = company_crud.get_recent_company_searches_by_names(
+            db, names.values(), current_user.id, hours=24
+        )
+
+        served: List[CompanyBatchSearchResult] = []
+        to_create: List[Dict[str, Any]] = []
+        for key, name in names.items():
+            profile = profiles.get(key)
+            existing_search = existing.get(key)
+            if profile and existing_search and existing_search.profile_hash == profile.content_hash:
+                info = profile.profile
+            elif profile:
+                # Record the search for this user, referencing the shared profile
+                to_create.append({"company_name": name, "search_query": batch_request.search_query,
+                                  "profile_hash": profile.content_hash, "information": profile.profile,
+                                  "source": "batch_cached"})
+                continue
+            elif (
+                existing_search
+                and existing_search.ai_generated_info
+                and normalize_key(existing_search.search_query) == normalize_key(batch_request.search_query)
+            ):
+                info = existing_search.ai_generated_info
+            else:
+                to_create.append({"company_name": name, "search_query": batch_request.search_query,
+                                  "source": "batch_lookup"})
+                continue
+            served.append(CompanyBatchSearchResult(
+                company_name=existing_search.company_name,
+                status="cached",
+                information=info,
+                search_timestamp=existing_search.search_timestamp,
+                message=f"Returning cached information for {existing_search.company_name}",
+                search_id=existing_search.id,
+            ))
+
+        # Lookups count against the user's hourly batch quota; check before starting any
+        lookups = sum(1 for item in to_create if item["source"] == "batch_lookup")
+        if lookups:
+            recent_lookups = company_crud.get_recent_searches_count(
+                db, current_user.id, hours=1, source="batch_lookup"
+            )
+            if recent_lookups + lookups > settings.COMPANY_BATCH_HOURLY_LIMIT:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=(
+                        f"Rate limit exceeded. This batch needs {lookups} new searches and "
+                        f"{max(settings.COMPANY_BATCH_HOURLY_LIMIT - recent_lookups, 0)} of the "
+                        f"{settings.COMPANY_BATCH_HOURLY_LIMIT} batch searches allowed per hour remain."
+                    )
+                )
+
+        # One INSERT for every new search record, cached or not
+        created = company_crud.bulk_create_company_searches(db, to_create, current_user.id)
+        pending: List[Dict[str, Any]] = []
+        for item, row in zip(to_create, created):
+            if "information" not in item:
+                pending.append(row)
+                continue
+            served.append(CompanyBatchSearchResult(
+                company_name=row["company_name"],
+                status="cached",
+                information=item["information"],
+                search_timestamp=row["search_timestamp"],
+                message=f"Returning cached information for {row['company_name']}",
+                search_id=row["id"],
+            ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while searching for company information: {str(e)}"
+        )
+
+    logger.info(
+        "Batch search by user %s: %d companies, %d cached, %d to look up",
+        current_user.id, len(names), len(served), len(pending),
+    )
+    return StreamingResponse(
+        _stream_batch_search(served, pending, batch_request.search_query),
+        media_type="application/x-ndjson",
+    )
+
 @router.put("/{company_id}", response_model=CompanyInformationRead)
 def update_company_info(
     company_id: int,
@@ -1,6 +1,9 @@
 ## `app/api/routes/pitchdeck.py`
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
+from sse_starlette.sse import EventSourceResponse
+import json
+import logging
 import tempfile
 import os
 
@@ -8,12 +11,17 @@ from app.db.models.user import User
 from app.api.deps import get_current_active_user
 from app.services.doc_processor_service import process_file_to_structured
 from app.services.pitchdeck_ai_service import pitchdeck_ai_service
+from app.utils.disconnect import cancel_on_disconnect
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/pitchdeck", tags=["pitchdeck"])
 
 
 @router.post("/ingest")
-async def ingest_pitchdeck(file: UploadFile = File(...), current_user: User = Depends(get_current_active_user)):
+async def ingest_pitchdeck(
+    request: Request, file: UploadFile = File(...), current_user: User = Depends(get_current_active_user)
+):
     """
     Full pipeline: process the uploaded document (DocAI / pptx) into normalized structured data,
     then run the pitchdeck analysis AI to return structured insights JSON to the client.
@@ -31,10 +39,12 @@ async def ingest_pitchdeck(file: UploadFile = File(...), current_user: User = De
             tmp_path = tmp.name
 
         # Step 1: Normalize with Doc processor
-        structured = await process_file_to_structured(tmp_path)
+        structured = await cancel_on_disconnect(request, process_file_to_structured(tmp_path))
 
         # Step 2: Analyze with Gemini-based Pitchdeck AI
-        summary = await pitchdeck_ai_service.summarize_structured_data(structured, file.filename)
+        summary = await cancel_on_disconnect(
+            request, pitchdeck_ai_service.summarize_structured_data(structured, file.filename)
+        )
 
         return {
             "filename": file.filename,
@@ -45,3 +55,46 @@ async def ingest_pitchdeck(file: UploadFile = File(...), current_user: User = De
     finally:
         if tmp_path and os.path.exists(tmp_path):
             os.remove(tmp_path)
+
+
+@router.post("/ingest/stream")
+async def ingest_pitchdeck_stream(
+    request: Request, file: UploadFile = File(...), current_user: User = Depends(get_current_active_user)
+):
+    """
+    Streaming variant of /pitchdeck/ingest over Server-Sent Events.
+
+    Events: "structured_data" once the document is processed, one "section" per
+    top-level analysis section as soon as it is generated, then "complete" with the
+    full analysis (same shape as /pitchdeck/ingest's "analysis"), or "error".
+    """
+    suffix = os.path.splitext(file.filename)[1]
+    tmp_path = None
+
+    if not (file.filename.endswith(".pdf") or file.filename.endswith(".pptx")):
+        raise HTTPException(status_code=400, detail="Only PDF and PPTX files are supported.")
+
+    try:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+            contents = await file.read()
+            tmp.write(contents)
+            tmp_path = tmp.name
+
+        # Normalize before streaming starts so processing errors are regular HTTP errors
+        structured = await cancel_on_disconnect(request, process_file_to_structured(tmp_path))
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    async def events():
+        yield {"event": "structured_data", "data": json.dumps(structured, default=str)}
+        try:
+            async for event, data in pitchdeck_ai_service.stream_structured_data(structured, file.filename):
+                yield {"event": event, "data": json.dumps(data, default=str)}
+        except HTTPException as e:
+            yield {"event": "error", "data": json.dumps({"status_code": e.status_code, "detail": e.detail})}
+        except Exception as e:
+            logger.exception("Streaming pitchdeck analysis failed for %s", file.filename)
+            yield {"event": "error", "data": json.dumps({"status_code": 500, "detail": str(e)})}
+
+    return EventSourceResponse(events())
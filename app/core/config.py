@@ -1,7 +1,8 @@
 import os
+import tempfile
 from pathlib import Path
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Dict, Optional
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 ENV_FILE_PATH = PROJECT_ROOT / ".env"
@@ -60,6 +61,80 @@ class Settings(BaseSettings):
     BENCHMARK_AGENT_BASE_URL: str
     DEALNOTE_AGENT_BASE_URL: str
 
+    # BigQuery: threads for blocking client calls, so slow jobs never block the event loop
+    BIGQUERY_EXECUTOR_WORKERS: int = 8
+    # In-process cache of startup / document-analysis reads, dropped per table on writes
+    BIGQUERY_CACHE_ENABLED: bool = True
+    BIGQUERY_CACHE_TTL_SECONDS: int = 5 * 60
+    BIGQUERY_CACHE_MAX_ENTRIES: int = 512
+    # document_analysis inserts are batched: rows per insert call, max wait, queue bound, retries
+    BIGQUERY_WRITE_BATCH_SIZE: int = 200
+    BIGQUERY_WRITE_FLUSH_SECONDS: float = 1.0
+    BIGQUERY_WRITE_QUEUE_SIZE: int = 5000
+    BIGQUERY_WRITE_MAX_RETRIES: int = 3
+    BIGQUERY_WRITE_BACKOFF_SECONDS: float = 0.5
+    # Document analyses go to a Postgres outbox first; a worker drains it to BigQuery
+    BIGQUERY_OUTBOX_POLL_SECONDS: float = 2.0
+    BIGQUERY_OUTBOX_BATCH_SIZE: int = 50
+    BIGQUERY_OUTBOX_LEASE_SECONDS: int = 120
+    BIGQUERY_OUTBOX_MAX_ATTEMPTS: int = 10
+    BIGQUERY_OUTBOX_BACKOFF_SECONDS: float = 5.0
+
+    # Request deadline (seconds) when the client sends no X-Request-Timeout, and the cap on it
+    REQUEST_DEADLINE_SECONDS: float = 300.0
+    REQUEST_DEADLINE_MAX_SECONDS: float = 900.0
+    # How often long-running endpoints check whether the client has gone away
+    CLIENT_DISCONNECT_POLL_SECONDS: float = 1.0
+
+    # Agent session registry (skips the session bootstrap POST for known sessions)
+    AGENT_SESSION_TTL_SECONDS: int = 60 * 60
+    AGENT_SESSION_REGISTRY_SIZE: int = 10000
+
+    # LLM gateway: pooled connections and retries for every Gemini call
+    LLM_HTTP_MAX_CONNECTIONS: int = 20
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BACKOFF_SECONDS: float = 0.5
+    # A retry is skipped unless at least this much of the request deadline would remain for it
+    LLM_MIN_ATTEMPT_SECONDS: float = 5.0
+    VERTEX_LOCATION: str = "us-central1"
+    # Hedged requests: after a call passes the p95 latency of its model and prompt size
+    # (once that many samples exist), send one backup; hedges are capped at this share of calls
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_BUDGET_RATIO: float = 0.05
+    # Pin a routing task (company_search, pitchdeck_summary, pitchdeck_map,
+    # document_extraction) to a model, e.g. {"pitchdeck_summary": "gemini-1.5-pro"}
+    LLM_ROUTE_OVERRIDES: Dict[str, str] = {}
+
+    # Gemini context caching of static system instructions
+    CONTEXT_CACHE_ENABLED: bool = True
+    CONTEXT_CACHE_TTL_SECONDS: int = 60 * 60
+    CONTEXT_CACHE_REFRESH_MARGIN_SECONDS: int = 5 * 60
+
+    # LLM response cache (memory LRU in front of an optional SQLite file)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 7
+    LLM_CACHE_MEMORY_MAX_ENTRIES: int = 512
+    LLM_CACHE_SQLITE_PATH: Optional[str] = os.path.join(tempfile.gettempdir(), "scopify_llm_cache.sqlite3")
+    LLM_CACHE_DISK_MAX_ENTRIES: int = 5000
+
+    # Searches each user may run per hour through /company/search
+    COMPANY_SEARCH_HOURLY_LIMIT: int = 10
+
+    # Batch company search: names per request, AI lookups per user per hour (a separate
+    # quota from single searches), concurrent Gemini lookups, rows per bulk write
+    COMPANY_BATCH_MAX_SIZE: int = 200
+    COMPANY_BATCH_HOURLY_LIMIT: int = 200
+    COMPANY_BATCH_CONCURRENCY: int = 5
+    COMPANY_BATCH_WRITE_SIZE: int = 20
+
+    # Pitchdeck summaries: estimated prompt tokens given to deck content
+    PITCHDECK_CONTEXT_TOKEN_BUDGET: int = 8000
+    # Above this many content tokens, summarize chunks in parallel and reduce the notes
+    PITCHDECK_MAP_REDUCE_THRESHOLD_TOKENS: int = 16000
+    PITCHDECK_MAP_CHUNK_TOKENS: int = 4000
+    PITCHDECK_MAP_CONCURRENCY: int = 6
+
 settings = Settings()
 
 # Debug: Print all settings
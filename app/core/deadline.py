@@ -0,0 +1,89 @@
+"""
+Request-scoped deadlines.
+
+DeadlineMiddleware sets an absolute deadline for each HTTP request, from the
+X-Request-Timeout header (seconds) or REQUEST_DEADLINE_SECONDS, and stores it in
+a contextvar. Upstream calls (Vision, Gemini, BigQuery, agents) size their
+timeouts with stage_timeout() and check can_retry() before backing off, so the
+whole request finishes within its budget instead of each stage using its own.
+"""
+import logging
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = b"x-request-timeout"
+
+# Absolute time.monotonic() deadline of the current request, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before an upstream call could start."""
+
+
+def set_deadline(seconds: float) -> Token:
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token: Token) -> None:
+    _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or None outside a request."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def stage_timeout(default: float) -> float:
+    """
+    Timeout for the next upstream call: its own default, capped by the remaining
+    request budget. Raises DeadlineExceeded if the budget is already spent.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return min(default, left)
+
+
+def can_retry(needed: float) -> bool:
+    """Whether `needed` more seconds (backoff plus a useful attempt) fit in the budget."""
+    left = remaining()
+    return left is None or left > needed
+
+
+class DeadlineMiddleware:
+    """Pure ASGI middleware so the contextvar is visible to the endpoint and its streaming body."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = settings.REQUEST_DEADLINE_SECONDS
+        for name, value in scope.get("headers") or []:
+            if name == DEADLINE_HEADER:
+                try:
+                    seconds = float(value)
+                except ValueError:
+                    logger.warning("Ignoring invalid X-Request-Timeout header: %r", value)
+                break
+        seconds = max(0.0, min(seconds, settings.REQUEST_DEADLINE_MAX_SECONDS))
+
+        token = set_deadline(seconds)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_deadline(token)
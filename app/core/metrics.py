@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics: counters, timers (count/total/max) and gauges
+    computed on demand. Exposed to admins via GET /admin/metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timers: Dict[str, Dict[str, float]] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> str:
+        if not labels:
+            return name
+        rendered = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+        return f"{name}{{{rendered}}}"
+
+    def incr(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name: str, value_ms: float, **labels: Any) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            timer = self._timers.setdefault(key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            timer["count"] += 1
+            timer["total_ms"] += value_ms
+            timer["max_ms"] = max(timer["max_ms"], value_ms)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - started) * 1000, **labels)
+
+    def register_gauge(self, name: str, fn: Callable[[], Any]) -> None:
+        with self._lock:
+            self._gauges[name] = fn
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            timers = {
+                key: {**timer, "avg_ms": timer["total_ms"] / timer["count"] if timer["count"] else 0.0}
+                for key, timer in self._timers.items()
+            }
+            gauges = dict(self._gauges)
+        return {
+            "counters": counters,
+            "timers": timers,
+            "gauges": {name: fn() for name, fn in gauges.items()},
+        }
+
+
+metrics = MetricsRegistry()
@@ -1,9 +1,15 @@
-from typing import List, Optional
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import orjson
 
 from app.db.models.company import CompanyInformation
+from app.db.models.company_profile import CompanyProfile
 from app.schemas.company import CompanyInformationCreate
+from app.utils.text import normalize_key
 
 def get_companies(
     db: Session, 
@@ -23,14 +29,16 @@ def get_companies(
 def create_company_search(
     db: Session, 
     company_info: CompanyInformationCreate, 
-    requested_by_id: int
+    requested_by_id: int,
+    profile_hash: Optional[str] = None
 ) -> CompanyInformation:
-    """Create a new company information search record."""
+    """Create a new company information search record, optionally referencing a shared profile."""
     db_company_info = CompanyInformation(
         company_name=company_info.company_name,
         ai_generated_info=company_info.ai_generated_info,
         search_query=company_info.search_query,
         requested_by_id=requested_by_id,
+        profile_hash=profile_hash,
         pitch_deck_url=company_info.pitch_deck_url,
         benchmark_status=company_info.benchmark_status,
         benchmark_info=company_info.benchmark_info,
@@ -128,18 +136,250 @@ def delete_company_search(db: Session, search_id: int) -> bool:
     return True
 
 
-def get_recent_searches_count(db: Session, user_id: int, hours: int = 24) -> int:
-    """Get count of recent searches by user in the last N hours."""
-    from datetime import datetime, timedelta
-    
+def get_recent_searches_count(
+    db: Session, user_id: int, hours: int = 24, source: Optional[str] = None
+) -> int:
+    """
+    Get count of recent searches by user in the last N hours, from one source
+    (None for single searches, e.g. "batch_lookup" for batch lookups).
+    """
     cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+    source_filter = (
+        CompanyInformation.source.is_(None) if source is None else CompanyInformation.source == source
+    )
     return (
         db.query(CompanyInformation)
         .filter(
             and_(
                 CompanyInformation.requested_by_id == user_id,
-                CompanyInformation.created_at >= cutoff_time
+                CompanyInformation.created_at >= cutoff_time,
+                source_filter
             )
         )
         .count()
     )
+
+
+def _query_key(search_query: Optional[str]) -> str:
+    """"" for the default profile prompt, otherwise a digest of the normalized custom query."""
+    query = normalize_key(search_query)
+    return hashlib.sha256(query.encode("utf-8")).hexdigest() if query else ""
+
+
+def _profile_hash(company_key: str, query_key: str, profile: Dict[str, Any]) -> str:
+    # The company and query are part of the identity, so identical content never merges two of them
+    payload = {"company_key": company_key, "query_key": query_key, "profile": profile}
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS, default=str)).hexdigest()
+
+
+def upsert_company_profile(
+    db: Session,
+    company_name: str,
+    profile: Dict[str, Any],
+    ai_model: Optional[str] = None,
+    search_query: Optional[str] = None
+) -> CompanyProfile:
+    """
+    Store an AI-generated profile by content hash (shared across users), under the
+    company and the custom `search_query` it answers (None for the default profile).
+    Identical content is stored once; regenerating it only bumps refreshed_at.
+    """
+    company_key = normalize_key(company_name)
+    query_key = _query_key(search_query)
+    content_hash = _profile_hash(company_key, query_key, profile)
+    now = datetime.utcnow()
+    stmt = pg_insert(CompanyProfile).values(
+        content_hash=content_hash,
+        company_key=company_key,
+        query_key=query_key,
+        company_name=company_name,
+        profile=profile,
+        ai_model=ai_model,
+        created_at=now,
+        refreshed_at=now,
+    ).on_conflict_do_update(
+        index_elements=[CompanyProfile.content_hash],
+        set_={"refreshed_at": now},
+    )
+    db.execute(stmt)
+    db.commit()
+    return db.get(CompanyProfile, content_hash, populate_existing=True)
+
+
+def get_recent_company_profile(
+    db: Session,
+    company_name: str,
+    search_query: Optional[str] = None,
+    hours: int = 24
+) -> Optional[CompanyProfile]:
+    """
+    Get the most recently generated shared profile for a company and search query
+    (None for the default profile), if within the last N hours.
+    """
+    cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+    return (
+        db.query(CompanyProfile)
+        .filter(
+            and_(
+                CompanyProfile.company_key == normalize_key(company_name),
+                CompanyProfile.query_key == _query_key(search_query),
+                CompanyProfile.refreshed_at >= cutoff_time
+            )
+        )
+        .order_by(CompanyProfile.refreshed_at.desc())
+        .first()
+    )
+
+
+def get_recent_company_profiles(
+    db: Session,
+    company_names: Iterable[str],
+    search_query: Optional[str] = None,
+    hours: int = 24
+) -> Dict[str, CompanyProfile]:
+    """
+    Batch form of get_recent_company_profile for one search query: newest recent
+    profile per normalized company name.
+    """
+    keys = {normalize_key(name) for name in company_names}
+    if not keys:
+        return {}
+    cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+    profiles = (
+        db.query(CompanyProfile)
+        .filter(
+            and_(
+                CompanyProfile.company_key.in_(keys),
+                CompanyProfile.query_key == _query_key(search_query),
+                CompanyProfile.refreshed_at >= cutoff_time
+            )
+        )
+        .order_by(CompanyProfile.refreshed_at.desc())
+        .all()
+    )
+    latest: Dict[str, CompanyProfile] = {}
+    for profile in profiles:
+        latest.setdefault(profile.company_key, profile)
+    return latest
+
+
+def get_recent_company_searches_by_names(
+    db: Session,
+    company_names: Iterable[str],
+    user_id: int,
+    hours: int = 24
+) -> Dict[str, CompanyInformation]:
+    """A user's newest search per company name (case-insensitive exact match) within the last N hours."""
+    names = {name.strip().lower() for name in company_names}
+    if not names:
+        return {}
+    cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+    searches = (
+        db.query(CompanyInformation)
+        .filter(
+            and_(
+                func.lower(CompanyInformation.company_name).in_(names),
+                CompanyInformation.requested_by_id == user_id,
+                CompanyInformation.created_at >= cutoff_time
+            )
+        )
+        .order_by(CompanyInformation.created_at.desc())
+        .all()
+    )
+    latest: Dict[str, CompanyInformation] = {}
+    for search in searches:
+        latest.setdefault(normalize_key(search.company_name), search)
+    return latest
+
+
+def bulk_create_company_searches(
+    db: Session,
+    searches: List[Dict[str, Any]],
+    requested_by_id: int
+) -> List[Dict[str, Any]]:
+    """
+    Insert many search records in one statement. Each item needs company_name and may set
+    search_query / profile_hash / source. Returns id, company_name and search_timestamp per row, in order.
+    """
+    if not searches:
+        return []
+    now = datetime.utcnow()
+    rows = [
+        {
+            "company_name": item["company_name"],
+            "search_query": item.get("search_query"),
+            "profile_hash": item.get("profile_hash"),
+            "source": item.get("source"),
+            "requested_by_id": requested_by_id,
+            "search_timestamp": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for item in searches
+    ]
+    table = CompanyInformation.__table__
+    result = db.execute(
+        insert(table).returning(
+            table.c.id, table.c.company_name, table.c.search_timestamp, sort_by_parameter_order=True
+        ),
+        rows,
+    )
+    created = [dict(row._mapping) for row in result]
+    db.commit()
+    return created
+
+
+def bulk_upsert_company_profiles(
+    db: Session,
+    profiles: List[Dict[str, Any]],
+    ai_model: Optional[str] = None,
+    search_query: Optional[str] = None
+) -> List[str]:
+    """
+    Batch form of upsert_company_profile for items with company_name, profile and
+    optionally ai_model (default `ai_model`), answering `search_query`. Returns the
+    content hash of each item, in order.
+    """
+    if not profiles:
+        return []
+    now = datetime.utcnow()
+    rows: Dict[str, Dict[str, Any]] = {}
+    hashes = []
+    query_key = _query_key(search_query)
+    for item in profiles:
+        company_key = normalize_key(item["company_name"])
+        content_hash = _profile_hash(company_key, query_key, item["profile"])
+        hashes.append(content_hash)
+        rows[content_hash] = {
+            "content_hash": content_hash,
+            "company_key": company_key,
+            "query_key": query_key,
+            "company_name": item["company_name"],
+            "profile": item["profile"],
+            "ai_model": item.get("ai_model", ai_model),
+            "created_at": now,
+            "refreshed_at": now,
+        }
+    stmt = pg_insert(CompanyProfile).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CompanyProfile.content_hash],
+        set_={"refreshed_at": stmt.excluded.refreshed_at},
+    )
+    db.execute(stmt)
+    db.commit()
+    return hashes
+
+
+def bulk_set_search_profiles(db: Session, profile_hashes: Dict[int, str]) -> None:
+    """Point many search records at their shared profile in one executemany."""
+    if not profile_hashes:
+        return
+    now = datetime.utcnow()
+    db.execute(
+        update(CompanyInformation),
+        [
+            {"id": search_id, "profile_hash": content_hash, "_ai_generated_info": None, "updated_at": now}
+            for search_id, content_hash in profile_hashes.items()
+        ],
+    )
+    db.commit()
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from app.db.models.document_analysis import DocumentAnalysis
+
+# processing_status values used by the BigQuery outbox
+OUTBOX_PENDING = "pending"
+OUTBOX_COMPLETED = "completed"
+OUTBOX_FAILED = "failed"
+
+
+def create_document_analysis(db: Session, fields: Dict[str, Any]) -> DocumentAnalysis:
+    """Record an analysis in the outbox (processing_status pending) until it reaches BigQuery."""
+    db_analysis = DocumentAnalysis(**fields, processing_status=OUTBOX_PENDING, sync_attempts=0)
+    db.add(db_analysis)
+    db.commit()
+    db.refresh(db_analysis)
+    return db_analysis
+
+
+def claim_pending_document_analyses(db: Session, limit: int, lease_seconds: int) -> List[DocumentAnalysis]:
+    """
+    Lease up to `limit` pending analyses that are due. Rows locked by another instance
+    are skipped; a row whose lease ran out (worker died mid-sync) is claimed again.
+    """
+    now = datetime.utcnow()
+    claimed = (
+        db.query(DocumentAnalysis)
+        .filter(
+            DocumentAnalysis.processing_status == OUTBOX_PENDING,
+            DocumentAnalysis.bigquery_row_id.isnot(None),
+            or_(DocumentAnalysis.next_attempt_at.is_(None), DocumentAnalysis.next_attempt_at <= now),
+            or_(DocumentAnalysis.locked_until.is_(None), DocumentAnalysis.locked_until <= now),
+        )
+        .order_by(DocumentAnalysis.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for analysis in claimed:
+        analysis.locked_until = now + timedelta(seconds=lease_seconds)
+    db.commit()
+    return claimed
+
+
+def mark_document_analyses_synced(db: Session, analysis_ids: List[int]) -> None:
+    if not analysis_ids:
+        return
+    now = datetime.utcnow()
+    db.execute(
+        update(DocumentAnalysis)
+        .where(DocumentAnalysis.id.in_(analysis_ids))
+        .values(processing_status=OUTBOX_COMPLETED, synced_at=now, locked_until=None, error_message=None)
+    )
+    db.commit()
+
+
+def mark_document_analysis_retry(
+    db: Session, analysis_id: int, error: str, next_attempt_at: datetime, give_up: bool = False
+) -> None:
+    """Release the lease after a failed sync, scheduling the next attempt or marking the row failed."""
+    db.execute(
+        update(DocumentAnalysis)
+        .where(DocumentAnalysis.id == analysis_id)
+        .values(
+            processing_status=OUTBOX_FAILED if give_up else OUTBOX_PENDING,
+            sync_attempts=DocumentAnalysis.sync_attempts + 1,
+            next_attempt_at=next_attempt_at,
+            locked_until=None,
+            error_message=error[:1000],
+        )
+    )
+    db.commit()
+
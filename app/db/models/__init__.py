@@ -1,6 +1,7 @@
 from .user import User, UserRole
 from .startup import StartupEvaluation, Startup
 from .company import CompanyInformation
+from .company_profile import CompanyProfile
 from .document_analysis import DocumentAnalysis
 
 __all__ = [
@@ -9,5 +10,6 @@ __all__ = [
     "StartupEvaluation",
     "Startup",
     "CompanyInformation",
+    "CompanyProfile",
     "DocumentAnalysis"
 ]
\ No newline at end of file
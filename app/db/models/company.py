@@ -10,8 +10,13 @@ class CompanyInformation(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     company_name = Column(String(255), nullable=False, index=True)
-    ai_generated_info = Column(JSON, nullable=True)
+    # Per-row override; searches normally reference a shared CompanyProfile instead
+    _ai_generated_info = Column("ai_generated_info", JSON, nullable=True)
+    profile_hash = Column(String(64), ForeignKey("company_profiles.content_hash"), nullable=True, index=True)
+    profile = relationship("CompanyProfile", lazy="joined")
     search_query = Column(Text, nullable=True)
+    # None for /company/search; "batch_cached" / "batch_lookup" for /company/search/batch rows
+    source = Column(String(20), nullable=True)
     search_timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     requested_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -32,3 +37,14 @@ class CompanyInformation(Base):
         onupdate=datetime.utcnow,
         nullable=False,
     )
+
+    @property
+    def ai_generated_info(self):
+        """Row-level info if set, otherwise the referenced shared profile."""
+        if self._ai_generated_info is not None:
+            return self._ai_generated_info
+        return self.profile.profile if self.profile is not None else None
+
+    @ai_generated_info.setter
+    def ai_generated_info(self, value):
+        self._ai_generated_info = value
@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.db.base import Base
+
+
+class CompanyProfile(Base):
+    """
+    AI-generated company profile shared by every search that produced the same content.
+    Answers to a custom search query are kept apart from the default profile by query_key.
+    """
+
+    __tablename__ = "company_profiles"
+
+    content_hash = Column(String(64), primary_key=True)  # sha256 of company, query and canonical profile JSON
+    company_key = Column(String(255), nullable=False, index=True)  # normalized company name
+    query_key = Column(String(64), nullable=False, default="", server_default="")  # "" for the default prompt
+    company_name = Column(String(255), nullable=False)
+    profile = Column(JSONB, nullable=False)
+    ai_model = Column(String(100), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # last time it was (re)generated
@@ -30,6 +30,15 @@ class DocumentAnalysis(Base):
     # ✅ Relationship back to Startup
     startup = relationship("Startup", back_populates="document_analyses")
 
-    # Processing status
+    pitch_deck_url = Column(String, nullable=True)
+
+    # Processing status; doubles as the BigQuery outbox state (pending until synced)
     processing_status = Column(String, default="pending")  # pending, completed, failed
-    error_message = Column(String, nullable=True)
\ No newline at end of file
+    error_message = Column(String, nullable=True)
+
+    # BigQuery outbox: id (and insert ID) of the BigQuery row, retry schedule and lease
+    bigquery_row_id = Column(String(32), unique=True, index=True, nullable=True)
+    sync_attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+    synced_at = Column(DateTime, nullable=True)
@@ -48,6 +48,24 @@ def get_db() -> Generator:
         db.close()
 
 
+# Columns added to tables that already existed; create_all() only creates missing tables.
+ADDITIVE_SCHEMA_CHANGES = [
+    "ALTER TABLE company_information ADD COLUMN IF NOT EXISTS profile_hash VARCHAR(64) REFERENCES company_profiles (content_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_company_information_profile_hash ON company_information (profile_hash)",
+    "ALTER TABLE company_information ADD COLUMN IF NOT EXISTS source VARCHAR(20)",
+    "ALTER TABLE company_profiles ADD COLUMN IF NOT EXISTS query_key VARCHAR(64) NOT NULL DEFAULT ''",
+    "CREATE INDEX IF NOT EXISTS ix_company_profiles_company_query ON company_profiles (company_key, query_key)",
+    "ALTER TABLE document_analysis ADD COLUMN IF NOT EXISTS pitch_deck_url VARCHAR",
+    "ALTER TABLE document_analysis ADD COLUMN IF NOT EXISTS bigquery_row_id VARCHAR(32)",
+    "ALTER TABLE document_analysis ADD COLUMN IF NOT EXISTS sync_attempts INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE document_analysis ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP",
+    "ALTER TABLE document_analysis ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP",
+    "ALTER TABLE document_analysis ADD COLUMN IF NOT EXISTS synced_at TIMESTAMP",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_document_analysis_bigquery_row_id ON document_analysis (bigquery_row_id)",
+    "CREATE INDEX IF NOT EXISTS ix_document_analysis_outbox ON document_analysis (processing_status, next_attempt_at)",
+]
+
+
 def init_db() -> None:
     """Initialize database schema in Cloud SQL (create tables if not exists)."""
     try:
@@ -55,6 +73,9 @@ def init_db() -> None:
         from app.db import models  # ensures models are registered
 
         Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            for statement in ADDITIVE_SCHEMA_CHANGES:
+                conn.execute(text(statement))
         print("✅ Database tables created successfully in Cloud SQL")
     except SQLAlchemyError as e:
         print(f"❌ Failed to create database tables: {e}")
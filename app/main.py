@@ -1,10 +1,14 @@
+from contextlib import asynccontextmanager
 from datetime import datetime
+import asyncio
 import json
 import os
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import JSONResponse
 import sys
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, DeadlineMiddleware
 from app.db.models.user import UserRole
 from app.db.session import init_db
 from app.api.routes.auth import router as auth_router
@@ -13,11 +17,14 @@ from app.api.routes.company import router as company_router
 from app.api.routes.admin import router as admin_router
 from app.api.routes.bigquery import router as bigquery_router
 from app.api.routes.agent import router as agent_router
+from app.api.routes.pitchdeck import router as pitchdeck_router
 from app.api.deps import get_current_user
 from app import crud, schemas
 from app.db.session import get_db
 from sqlalchemy.orm import Session
 from app.api.routes.flag import router as flag_router
+from app.services.bigquery_service import BigQueryService
+from app.services.llm_gateway import llm_gateway
 from app.schemas.startup import StartupCreate
 from app.schemas.company import CompanyInformationCreate
 
@@ -76,9 +83,32 @@ def seed_mock_data(db: Session, file_path: str):
                 db, dto, requested_by_id=c["requested_by_id"]
             )
 
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    # One BigQuery client for the process; dataset/table checks run here, not per request
+    try:
+        application.state.bigquery_service = await asyncio.to_thread(BigQueryService)
+    except Exception as e:
+        print(f"⚠️ BigQuery service unavailable: {e}")
+        application.state.bigquery_service = None
+
+    # Drain document analyses from the Postgres outbox to BigQuery in the background
+    if application.state.bigquery_service is not None:
+        application.state.bigquery_service.outbox.start()
+
+    yield
+
+    # Close pooled LLM connections and the BigQuery executor on shutdown; unsynced
+    # outbox rows stay pending in Postgres for the next instance
+    await llm_gateway.aclose()
+    if application.state.bigquery_service is not None:
+        await application.state.bigquery_service.outbox.stop()
+        await asyncio.to_thread(application.state.bigquery_service.close)
+
+
 def create_app() -> FastAPI:
     print(f"🚀 Starting {settings.SCOPIFY_PROJECT_NAME}")
-    application = FastAPI(title=settings.SCOPIFY_PROJECT_NAME)
+    application = FastAPI(title=settings.SCOPIFY_PROJECT_NAME, lifespan=lifespan)
     # Allow CORS only for the deployed frontend
     application.add_middleware(
         CORSMiddleware,
@@ -88,6 +118,13 @@ def create_app() -> FastAPI:
         allow_headers=["*"] ,
     )
     
+    # Request-scoped deadline carried to every upstream call
+    application.add_middleware(DeadlineMiddleware)
+
+    @application.exception_handler(DeadlineExceeded)
+    async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+        return JSONResponse(status_code=504, content={"detail": str(exc)})
+
     # CORS middleware removed
     # Routers
     application.include_router(auth_router)
@@ -97,6 +134,7 @@ def create_app() -> FastAPI:
     application.include_router(bigquery_router)
     application.include_router(agent_router)
     application.include_router(flag_router)
+    application.include_router(pitchdeck_router)
 
     return application
 
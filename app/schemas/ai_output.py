@@ -0,0 +1,149 @@
+"""
+Shapes the Gemini calls are constrained to (via responseSchema). Fields are
+nullable strings where the model may legitimately have nothing to report.
+"""
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+# --- Company search (GoogleAIService) ---
+
+class Executive(BaseModel):
+    name: str
+    title: Optional[str] = None
+
+
+class CompanyProfileOutput(BaseModel):
+    company_overview: str
+    industry: Optional[str] = None
+    founded_year: Optional[str] = None
+    location: Optional[str] = None
+    key_executives: List[Executive] = []
+    products_services: List[str] = []
+    recent_news: List[str] = []
+    financial_information: Optional[str] = None
+    company_size: Optional[str] = None
+    website: Optional[str] = None
+    social_media: List[str] = []
+    partnerships: List[str] = []
+
+
+# --- Pitchdeck summary (PitchdeckAIService) ---
+
+class CompanyInfoSection(BaseModel):
+    name: Optional[str] = None
+    logo: Optional[str] = None
+    website: Optional[str] = None
+    hq: Optional[str] = None
+    sector: Optional[str] = None
+    stage: Optional[str] = None
+    intro_source: Optional[str] = None
+
+
+class DealContextSection(BaseModel):
+    why_now: Optional[str] = None
+    round_size: Optional[str] = None
+    valuation: Optional[str] = None
+    lead_investor: Optional[str] = None
+    syndicate: Optional[str] = None
+
+
+class CompanyOverviewSection(BaseModel):
+    one_liner: Optional[str] = None
+    mission: Optional[str] = None
+    problem_snapshot: Optional[str] = None
+    solution_snapshot: Optional[str] = None
+
+
+class FounderAssessmentSection(BaseModel):
+    bios: Optional[str] = None
+    prior_experience: Optional[str] = None
+    founder_market_fit: Optional[str] = None
+    communication_style: Optional[str] = None
+    coachability: Optional[str] = None
+
+
+class TractionMetricsSection(BaseModel):
+    revenue: Optional[str] = None
+    arr: Optional[str] = None
+    gmvs: Optional[str] = None
+    users_customers: Optional[str] = None
+    growth: Optional[str] = None
+    key_kpis: List[str] = []
+
+
+class ProductTechnologySection(BaseModel):
+    product_details: Optional[str] = None
+    moat: Optional[str] = None
+    roadmap: Optional[str] = None
+    defensibility: Optional[str] = None
+
+
+class MarketCompetitionSection(BaseModel):
+    tam_sam_som: Optional[str] = None
+    trends: Optional[str] = None
+    competitors: List[str] = []
+    differentiation: Optional[str] = None
+
+
+class RisksConcernsSection(BaseModel):
+    business_model_risk: Optional[str] = None
+    adoption_risk: Optional[str] = None
+    team_gaps: Optional[str] = None
+    competitive_threats: Optional[str] = None
+
+
+class DealDynamicsSection(BaseModel):
+    valuation_vs_traction: Optional[str] = None
+    thesis_fit: Optional[str] = None
+    other_vc_interest: Optional[str] = None
+    timeline_urgency: Optional[str] = None
+
+
+class InternalNotesSection(BaseModel):
+    analyst_commentary: Optional[str] = None
+    diligence_questions: List[str] = []
+    recommendation: Optional[str] = None
+
+
+class ValuationMultiplesSection(BaseModel):
+    ev_revenue: Optional[str] = None
+    ev_ebitda: Optional[str] = None
+    p_e: Optional[str] = None
+    ev_gmv: Optional[str] = None
+    ev_users: Optional[str] = None
+    ev_arr: Optional[str] = None
+
+
+class PitchdeckSummaryOutput(BaseModel):
+    company_info: CompanyInfoSection
+    deal_context: DealContextSection
+    company_overview: CompanyOverviewSection
+    founder_assessment: FounderAssessmentSection
+    traction_metrics: TractionMetricsSection
+    product_technology: ProductTechnologySection
+    market_competition: MarketCompetitionSection
+    risks_concerns: RisksConcernsSection
+    deal_dynamics: DealDynamicsSection
+    internal_notes_next_steps: InternalNotesSection
+    valuation_multiples: ValuationMultiplesSection
+
+
+# --- Document extraction (BigQueryService) ---
+
+class DocumentExtractionOutput(BaseModel):
+    company_name: str
+    industry: Optional[str] = None
+    founding_year: Optional[int] = None
+    company_stage: Optional[str] = None
+    key_products: List[str] = []
+    target_market: Optional[str] = None
+    competitive_advantage: Optional[str] = None
+    revenue_model: Optional[str] = None
+    funding_status: Optional[str] = None
+    team_size: Optional[int] = None
+
+
+class DocumentExtractionBasicOutput(BaseModel):
+    company_name: str
+    industry: Optional[str] = None
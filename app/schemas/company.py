@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 class CompanyMinimal(BaseModel):
@@ -36,6 +36,7 @@ class CompanyInformationRead(CompanyInformationBase):
     id: int
     search_timestamp: datetime
     requested_by_id: int
+    profile_hash: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -51,6 +52,21 @@ class CompanySearchResponse(BaseModel):
     search_id: int
 
 
+class CompanyBatchSearchRequest(BaseModel):
+    company_names: List[str] = Field(..., min_length=1)
+    search_query: Optional[str] = None
+
+
+class CompanyBatchSearchResult(BaseModel):
+    """One NDJSON line of a batch search response."""
+    company_name: str
+    status: str  # "cached" | "created" | "error"
+    information: Optional[Dict[str, Any]] = None
+    search_timestamp: Optional[datetime] = None
+    message: str
+    search_id: Optional[int] = None
+
+
 class CompanySearchError(BaseModel):
     company_name: str
     error: str
@@ -1,17 +1,25 @@
 import base64
+import hashlib
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Optional
 from app.db.models.company import CompanyInformation
 from sqlalchemy.orm import Session
 import asyncio
 
 import httpx
+from app.core import deadline
 from app.core.config import settings
+from app.services.agent_session_registry import agent_session_registry
+from app.utils.json_extract import extract_json
 import json
-import re
 
 logger = logging.getLogger(__name__)
 
+
+class AgentSessionNotFoundError(RuntimeError):
+    """Raised when the agent /run endpoint no longer knows the session."""
+
+
 class AgentService:
     def __init__(self, base_url: Optional[str] = None, timeout: float = 120.0):
         self.base_url = (
@@ -29,17 +37,25 @@ class AgentService:
         )
         self.timeout = httpx.Timeout(60.0, read=60.0, write=60.0, connect=30.0)
 
+    def _request_timeout(self, seconds: float = 60.0) -> httpx.Timeout:
+        """Per-call timeout capped by what is left of the request deadline."""
+        budget = deadline.stage_timeout(seconds)
+        return httpx.Timeout(budget, connect=min(30.0, budget))
+
     async def invoke_session(self, app_name, user_id: str, session_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
         POST /apps//users/{userId}/sessions/{sessionId}
         """
         url = f"{self.base_url}/apps/{app_name}/users/{user_id}/sessions/{session_id}"
         logger.info("Invoking session: url=%s user=%s session=%s", url, user_id, session_id)
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with httpx.AsyncClient(timeout=self._request_timeout()) as client:
             resp = await client.post(url, json=payload, headers={"accept": "application/json"})
         if resp.is_success:
             logger.info("Session invoked successfully: %s", resp.json())
             return resp.json()
+        if self._is_session_exists_error(resp):
+            logger.info("Session already exists upstream: user=%s session=%s", user_id, session_id)
+            return {}
         raise RuntimeError(f"Agent session invocation failed: {self._extract_error(resp)}")
 
     async def run_app(self, payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -47,12 +63,46 @@ class AgentService:
         POST /run
         """
         url = f"{self.base_url}/run"
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with httpx.AsyncClient(timeout=self._request_timeout()) as client:
             resp = await client.post(url, json=payload, headers={"accept": "application/json"})
         if resp.is_success:
             return resp.json()
+        if self._is_session_not_found_error(resp):
+            raise AgentSessionNotFoundError(f"Run invocation failed: {self._extract_error(resp)}")
         raise RuntimeError(f"Run invocation failed: {self._extract_error(resp)}")
 
+    async def _run_with_session(
+        self,
+        *,
+        base_url: str,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        bootstrap: Callable[[], Awaitable[Any]],
+        run: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Run against a session, bootstrapping it only if the registry does not know it.
+        If /run reports the session as missing, the session is bootstrapped once more
+        and /run retried; any other error is raised as-is.
+        """
+        if not agent_session_registry.contains(base_url, app_name, user_id, session_id):
+            await bootstrap()
+            agent_session_registry.add(base_url, app_name, user_id, session_id)
+        else:
+            logger.debug("Reusing registered session: app=%s user=%s session=%s", app_name, user_id, session_id)
+
+        try:
+            result = await run()
+        except AgentSessionNotFoundError:
+            logger.warning("Session not found upstream, re-bootstrapping: app=%s user=%s session=%s", app_name, user_id, session_id)
+            agent_session_registry.discard(base_url, app_name, user_id, session_id)
+            await bootstrap()
+            result = await run()
+
+        agent_session_registry.add(base_url, app_name, user_id, session_id)
+        return result
+
     async def run_session_with_pdf(
         self,
         *,
@@ -69,13 +119,13 @@ class AgentService:
         parse_json: bool = True
     ) -> Dict[str, Any]:
         """
-        1) Invokes the session endpoint (bootstrap).
+        1) Invokes the session endpoint (bootstrap), unless the session is already registered.
         2) Encodes the file to base64 and calls /run with inlineData.
         """
         app_name = "startup-analyser"
         try:
             apps_url = f"{self.base_url}/list-apps"
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with httpx.AsyncClient(timeout=self._request_timeout()) as client:
                 apps_resp = await client.get(apps_url, headers={"accept": "application/json"})
             if apps_resp.is_success:
                 data = apps_resp.json()
@@ -90,8 +140,6 @@ class AgentService:
 
         bootstrap = session_bootstrap_payload or {"additionalProp1": {}}
 
-        await self.invoke_session(app_name, user_id, session_id, bootstrap)
-
         b64 = base64.b64encode(file_bytes).decode("utf-8")
 
         new_message = {
@@ -120,7 +168,14 @@ class AgentService:
         if state_delta:
             run_payload["stateDelta"] = state_delta
 
-        result = await self.run_app(run_payload)
+        result = await self._run_with_session(
+            base_url=self.base_url,
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            bootstrap=lambda: self.invoke_session(app_name, user_id, session_id, bootstrap),
+            run=lambda: self.run_app(run_payload),
+        )
         if not parse_json:
             return result
 
@@ -131,8 +186,7 @@ class AgentService:
 
         # Try to find and parse a JSON block from the texts
         for t in texts:
-            json_str = self._extract_json_string(t)
-            parsed = self._try_parse_json(json_str)
+            parsed = extract_json(t, allow_array=True)
             if parsed is not None:
                 return parsed
 
@@ -145,6 +199,13 @@ class AgentService:
         except Exception:
             return f"HTTP {resp.status_code}"
 
+    def _is_session_not_found_error(self, resp: httpx.Response) -> bool:
+        # Judged by the body: a bare 404 can also be a wrong base URL or app name
+        return "session not found" in resp.text.lower()
+
+    def _is_session_exists_error(self, resp: httpx.Response) -> bool:
+        return "already exists" in self._extract_error(resp).lower()
+
     def _extract_texts(self, payload: Any) -> list[str]:
         """
         Collect all content.parts[].text strings from the response.
@@ -161,38 +222,6 @@ class AgentService:
                     texts.append(t)
         return texts
 
-    def _extract_json_string(self, text: str) -> str:
-        """
-        Extract JSON from possible fenced blocks like ```json ... ``` or fallback to raw text.
-        Also handles cases where the block starts with ```json but has no closing fence.
-        """
-        t = text.strip()
-        m = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", t, re.IGNORECASE)
-        if m:
-            return m.group(1).strip()
-        # Handle a starting fence without a closing one: drop the first line (``` or ```json)
-        if t.startswith("```"):
-            lines = t.splitlines()
-            if lines:
-                t = "\n".join(lines[1:]).strip()
-        return t
-
-    def _try_parse_json(self, text: str) -> Optional[Dict[str, Any]]:
-        """
-        Try strict json parsing; if it fails, slice between first '{' and last '}'.
-        """
-        try:
-            return json.loads(text)
-        except Exception:
-            start = text.find("{")
-            end = text.rfind("}")
-            if start != -1 and end != -1 and end > start:
-                try:
-                    return json.loads(text[start : end + 1])
-                except Exception:
-                    return None
-            return None
-
     async def invoke_benchmark_research(self, payload: dict, company_id: int, db: Session) -> dict:
         """
         Invokes the /research endpoint on the benchmark agent.
@@ -202,7 +231,7 @@ class AgentService:
         """
         url = f"{self.benchmark_base_url}/research"
         logger.info("Invoking benchmark research: url=%s", url)
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with httpx.AsyncClient(timeout=self._request_timeout(30.0)) as client:
             resp = await client.post(
                 url,
                 json=payload,
@@ -244,7 +273,7 @@ class AgentService:
         """
         url = f"{self.benchmark_base_url}/research/{research_id}/progress"
         logger.info("Getting benchmark research progress: url=%s", url)
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with httpx.AsyncClient(timeout=self._request_timeout(30.0)) as client:
             resp = await client.get(
                 url,
                 headers={
@@ -285,7 +314,7 @@ class AgentService:
         """
         url = f"{self.benchmark_base_url}/research/{research_id}/report"
         logger.info("Getting benchmark research report: url=%s", url)
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with httpx.AsyncClient(timeout=self._request_timeout(30.0)) as client:
             resp = await client.get(
                 url,
                 headers={
@@ -306,7 +335,7 @@ class AgentService:
         dealnote_base = self.dealnote_base_url
         url = f"{dealnote_base}/apps/{app_name}/users/{user_id}/sessions/{session_id}"
         logger.info("Invoking dealnote session: url=%s user=%s session=%s", url, user_id, session_id)
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with httpx.AsyncClient(timeout=self._request_timeout()) as client:
             resp = await client.post(
                 url,
                 json=payload,
@@ -318,9 +347,52 @@ class AgentService:
         logger.debug("POST %s -> %s %s", url, resp.status_code, resp.reason_phrase)
         if resp.is_success:
             return resp.json()
+        if self._is_session_exists_error(resp):
+            logger.info("Dealnote session already exists upstream: user=%s session=%s", user_id, session_id)
+            return {}
         logger.error("Dealnote session failed: %s", resp.text)
         raise RuntimeError(f"Dealnote session invocation failed: {self._extract_error(resp)}")
 
+    def _dealnote_payload_hash(self, payload: Dict[str, Any]) -> str:
+        """
+        Stable sha256 of the dealnote payload (sorted keys, compact separators),
+        so semantically identical payloads map to the same stored result.
+        """
+        normalized = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _get_stored_dealnote(self, db_company: Optional[CompanyInformation], payload_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the persisted dealnote for this payload hash, if one was completed earlier.
+        """
+        if not db_company or db_company.deal_notes_status != "COMPLETE":
+            return None
+        if db_company.deal_notes_job_id != payload_hash or not db_company.dealnote_info:
+            return None
+        try:
+            return json.loads(db_company.dealnote_info)
+        except (TypeError, ValueError):
+            logger.warning("Stored dealnote for CompanyInformation id=%s is not valid JSON", db_company.id)
+            return None
+
+    def _set_dealnote_state(
+        self,
+        db: Session,
+        db_company: Optional[CompanyInformation],
+        status: str,
+        payload_hash: str,
+        result: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        if not db_company:
+            return
+        db_company.deal_notes_status = status
+        db_company.deal_notes_job_id = payload_hash
+        if result is not None:
+            db_company.dealnote_info = json.dumps(result)
+        db.commit()
+        db.refresh(db_company)
+        logger.info("Updated CompanyInformation id=%s: deal_notes_status=%s, deal_notes_job_id=%s", db_company.id, status, payload_hash)
+
     async def run_dealnote_app(
         self,
         *,
@@ -329,17 +401,66 @@ class AgentService:
         payload: Dict[str, Any],
         streaming: bool = False,
         state_delta: Optional[Dict[str, Any]] = None,
+        company_id: Optional[int] = None,
+        db: Optional[Session] = None,
+        force: bool = False,
     ) -> Dict[str, Any]:
         """
         The payload argument is stringified and sent in newMessage.parts[0].text.
+
+        When company_id and db are given, the parsed result is persisted on the
+        CompanyInformation record (dealnote_info / deal_notes_status), with
+        deal_notes_job_id holding the hash of the normalized payload. A later call
+        with an identical payload returns the stored result without re-running the
+        agent, unless force=True.
         """
+        db_company = None
+        payload_hash = self._dealnote_payload_hash(payload)
+        if company_id is not None and db is not None:
+            db_company = db.query(CompanyInformation).filter(CompanyInformation.id == company_id).first()
+            if not db_company:
+                logger.warning("CompanyInformation id=%s not found for dealnote update", company_id)
+            elif not force:
+                stored = self._get_stored_dealnote(db_company, payload_hash)
+                if stored is not None:
+                    logger.info("Returning stored dealnote for CompanyInformation id=%s (hash=%s)", company_id, payload_hash)
+                    return stored
+
+        if db_company:
+            self._set_dealnote_state(db, db_company, "IN_PROGRESS", payload_hash)
+        try:
+            result = await self._run_dealnote(
+                user_id=user_id,
+                session_id=session_id,
+                payload=payload,
+                streaming=streaming,
+                state_delta=state_delta,
+            )
+        except Exception:
+            if db_company:
+                self._set_dealnote_state(db, db_company, "FAILED", payload_hash)
+            raise
+
+        if db_company:
+            self._set_dealnote_state(db, db_company, "COMPLETE", payload_hash, result)
+        return result
+
+    async def _run_dealnote(
+        self,
+        *,
+        user_id: str,
+        session_id: str,
+        payload: Dict[str, Any],
+        streaming: bool = False,
+        state_delta: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         dealnote_base = self.dealnote_base_url
         url = f"{dealnote_base}/run"
 
         app_name = "dealnote-agent"
         try:
             apps_url = f"{dealnote_base}/list-apps"
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with httpx.AsyncClient(timeout=self._request_timeout()) as client:
                 apps_resp = await client.get(
                     apps_url,
                     headers={"accept": "application/json"},
@@ -355,9 +476,6 @@ class AgentService:
         except Exception as e:
             logger.warning("Error fetching app name from dealnote list-apps: %s", e)
 
-        await self.invoke_dealnote_session(app_name, user_id, session_id, {})
-
-
         run_payload = {
             "appName": app_name,
             "userId": user_id,
@@ -373,22 +491,14 @@ class AgentService:
             "streaming": streaming,
             "stateDelta": state_delta if state_delta is not None else {"additionalProp1": {}}
         }
-        logger.info("Calling dealnote /run: url=%s", url)
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            resp = await client.post(
-                url,
-                json=run_payload,
-                headers={
-                    "accept": "application/json",
-                    "content-type": "application/json",
-                },
-            )
-        logger.debug("POST %s -> %s %s", url, resp.status_code, resp.reason_phrase)
-        if not resp.is_success:
-            logger.error("Dealnote /run failed: %s", resp.text)
-            raise RuntimeError(f"Dealnote run invocation failed: {self._extract_error(resp)}")
-
-        result = resp.json()
+        result = await self._run_with_session(
+            base_url=dealnote_base,
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            bootstrap=lambda: self.invoke_dealnote_session(app_name, user_id, session_id, {}),
+            run=lambda: self._post_dealnote_run(url, run_payload),
+        )
 
         texts = self._extract_texts(result)
         if not texts:
@@ -396,14 +506,35 @@ class AgentService:
             raise RuntimeError("No text parts found in dealnote /run response")
 
         for t in texts:
-            json_str = self._extract_json_string(t)
-            parsed = self._try_parse_json(json_str)
+            parsed = extract_json(t, allow_array=True)
             if parsed is not None:
                 return parsed
 
         logger.error("Failed to parse JSON from dealnote /run response text")
         raise RuntimeError("Failed to parse JSON from dealnote /run response text")
 
+    async def _post_dealnote_run(self, url: str, run_payload: Dict[str, Any]) -> Any:
+        """
+        POST {dealnote_base}/run
+        """
+        logger.info("Calling dealnote /run: url=%s", url)
+        async with httpx.AsyncClient(timeout=self._request_timeout()) as client:
+            resp = await client.post(
+                url,
+                json=run_payload,
+                headers={
+                    "accept": "application/json",
+                    "content-type": "application/json",
+                },
+            )
+        logger.debug("POST %s -> %s %s", url, resp.status_code, resp.reason_phrase)
+        if resp.is_success:
+            return resp.json()
+        logger.error("Dealnote /run failed: %s", resp.text)
+        if self._is_session_not_found_error(resp):
+            raise AgentSessionNotFoundError(f"Dealnote run invocation failed: {self._extract_error(resp)}")
+        raise RuntimeError(f"Dealnote run invocation failed: {self._extract_error(resp)}")
+
     async def create_dealnote_session_and_run(
         self,
         *,
@@ -412,17 +543,23 @@ class AgentService:
         run_payload: Dict[str, Any],
         streaming: bool = False,
         state_delta: Optional[Dict[str, Any]] = None,
+        company_id: Optional[int] = None,
+        db: Optional[Session] = None,
+        force: bool = False,
     ) -> Dict[str, Any]:
         """
         Convenience helper that:
         1) Creates a Dealnote session (with empty payload)
         2) Triggers /run with the provided payload
-        Returns the response from /run.
+        Returns the response from /run (or the stored result for an identical payload).
         """
         return await self.run_dealnote_app(
             user_id=user_id,
             session_id=session_id,
             payload=run_payload,
             streaming=streaming,
-            state_delta=state_delta
+            state_delta=state_delta,
+            company_id=company_id,
+            db=db,
+            force=force,
         )
\ No newline at end of file
@@ -0,0 +1,53 @@
+import logging
+import threading
+from typing import Tuple
+
+from cachetools import TTLCache
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[str, str, str, str]
+
+
+class AgentSessionRegistry:
+    """
+    In-process LRU of agent sessions that are known to exist upstream.
+
+    Entries expire after the configured TTL (matched to the upstream session
+    lifetime) and are refreshed on every successful /run, so follow-up messages
+    on a live session skip the bootstrap POST.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._sessions: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(base_url: str, app_name: str, user_id: str, session_id: str) -> SessionKey:
+        return (base_url.rstrip("/"), app_name, user_id, session_id)
+
+    def contains(self, base_url: str, app_name: str, user_id: str, session_id: str) -> bool:
+        with self._lock:
+            return self._key(base_url, app_name, user_id, session_id) in self._sessions
+
+    def add(self, base_url: str, app_name: str, user_id: str, session_id: str) -> None:
+        """Register (or refresh the TTL of) a session."""
+        with self._lock:
+            self._sessions[self._key(base_url, app_name, user_id, session_id)] = True
+
+    def discard(self, base_url: str, app_name: str, user_id: str, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(self._key(base_url, app_name, user_id, session_id), None)
+        logger.info("Discarded agent session from registry: app=%s user=%s session=%s", app_name, user_id, session_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+agent_session_registry = AgentSessionRegistry(
+    maxsize=settings.AGENT_SESSION_REGISTRY_SIZE,
+    ttl=settings.AGENT_SESSION_TTL_SECONDS,
+)
@@ -0,0 +1,164 @@
+"""
+Durable outbox for document analyses bound for BigQuery.
+
+An analysis is first committed to the Postgres document_analysis table with
+processing_status "pending" and a BigQuery row id, so it survives a crash or a
+scale-down. A worker started with the app leases due rows (FOR UPDATE SKIP
+LOCKED, so several instances can drain in parallel), writes them to BigQuery and
+marks them "completed". A failed row is retried with exponential backoff; after
+BIGQUERY_OUTBOX_MAX_ATTEMPTS it is marked "failed" with the last error, and stays
+in Postgres to be requeued. Each batch upserts its startups in one MERGE. The
+row id is the BigQuery insert ID and the MERGE is an upsert, so a row synced
+twice after a lost lease is de-duplicated.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud import document_analysis as crud_document_analysis
+from app.db.session import SessionLocal
+
+if TYPE_CHECKING:
+    from app.services.bigquery_service import BigQueryService
+
+logger = logging.getLogger(__name__)
+
+# Columns copied from a claimed row; the ORM objects do not outlive their session
+_RECORD_FIELDS = (
+    "id", "bigquery_row_id", "file_name", "file_type", "analysis_timestamp", "raw_data",
+    "company_name", "industry", "founding_year", "company_stage", "key_products",
+    "target_market", "competitive_advantage", "revenue_model", "funding_status",
+    "team_size", "pitch_deck_url", "sync_attempts",
+)
+
+
+class DocumentAnalysisOutbox:
+    def __init__(self, service: "BigQueryService"):
+        self._service = service
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        self._enqueued = 0
+        self._synced = 0
+        self._retried = 0
+        self._failed = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "enqueued": self._enqueued,
+            "synced": self._synced,
+            "retried": self._retried,
+            "failed": self._failed,
+        }
+
+    async def enqueue(self, fields: Dict[str, Any]) -> int:
+        """Commit one analysis to the outbox and wake the worker. Returns the Postgres id."""
+        analysis_id = await asyncio.to_thread(self._create, fields)
+        self._enqueued += 1
+        metrics.incr("bigquery.outbox", outcome="enqueued")
+        self._wake.set()
+        return analysis_id
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name="bigquery-outbox")
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Finish the batch in progress; rows not yet synced stay pending for the next start."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("BigQuery outbox worker did not stop within %.0fs", timeout)
+        self._task = None
+
+    async def drain_once(self) -> int:
+        """Sync one batch of due rows. Returns how many were claimed."""
+        records = await asyncio.to_thread(self._claim)
+        if not records:
+            return 0
+
+        errors = await self._service._sync_document_analyses(records)
+
+        synced: List[int] = []
+        for record, error in zip(records, errors):
+            if error is not None:
+                await asyncio.to_thread(self._retry_later, record, error)
+            else:
+                synced.append(record["id"])
+        if synced:
+            await asyncio.to_thread(self._mark_synced, synced)
+            self._synced += len(synced)
+            metrics.incr("bigquery.outbox", len(synced), outcome="synced")
+        return len(records)
+
+    # --- Worker loop ---
+
+    async def _run(self) -> None:
+        logger.info("BigQuery outbox worker started")
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                claimed = await self.drain_once()
+            except Exception as e:
+                logger.error(f"BigQuery outbox drain failed: {e}", exc_info=True)
+                claimed = 0
+            if claimed >= settings.BIGQUERY_OUTBOX_BATCH_SIZE:
+                continue  # More may be due; keep draining
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.BIGQUERY_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+        logger.info("BigQuery outbox worker stopped")
+
+    # --- Postgres (run in worker threads) ---
+
+    def _create(self, fields: Dict[str, Any]) -> int:
+        with SessionLocal() as db:
+            return crud_document_analysis.create_document_analysis(db, fields).id
+
+    def _claim(self) -> List[Dict[str, Any]]:
+        with SessionLocal() as db:
+            claimed = crud_document_analysis.claim_pending_document_analyses(
+                db, settings.BIGQUERY_OUTBOX_BATCH_SIZE, settings.BIGQUERY_OUTBOX_LEASE_SECONDS
+            )
+            return [{field: getattr(analysis, field) for field in _RECORD_FIELDS} for analysis in claimed]
+
+    def _mark_synced(self, analysis_ids: List[int]) -> None:
+        with SessionLocal() as db:
+            crud_document_analysis.mark_document_analyses_synced(db, analysis_ids)
+
+    def _retry_later(self, record: Dict[str, Any], error: BaseException) -> None:
+        attempts = (record["sync_attempts"] or 0) + 1
+        give_up = attempts >= settings.BIGQUERY_OUTBOX_MAX_ATTEMPTS
+        delay = settings.BIGQUERY_OUTBOX_BACKOFF_SECONDS * (2 ** (attempts - 1))
+        with SessionLocal() as db:
+            crud_document_analysis.mark_document_analysis_retry(
+                db,
+                record["id"],
+                f"BigQuery sync failed: {error}",
+                datetime.utcnow() + timedelta(seconds=delay),
+                give_up=give_up,
+            )
+        if give_up:
+            self._failed += 1
+            metrics.incr("bigquery.outbox", outcome="failed")
+            logger.error(
+                "Document analysis %s (%s) not synced to BigQuery after %d attempts, marked failed: %s",
+                record["id"], record["file_name"], attempts, error,
+            )
+        else:
+            self._retried += 1
+            metrics.incr("bigquery.outbox", outcome="retried")
+            logger.warning(
+                "Document analysis %s BigQuery sync failed (attempt %d/%d), retrying in %.0fs: %s",
+                record["id"], attempts, settings.BIGQUERY_OUTBOX_MAX_ATTEMPTS, delay, error,
+            )
@@ -0,0 +1,113 @@
+"""
+Parameterized SELECT builder for BigQuery tables.
+
+Filter columns must be in the table's whitelist, which also fixes each
+column's BigQuery type and therefore its operator: substring match for
+STRING, equality for numbers and BOOL, IN UNNEST(...) for lists. Values are
+only ever bound as @parameters named after their column, and filters are
+emitted in column order, so requests with the same filter shape produce
+identical SQL text and can share BigQuery's cached results and plans.
+"""
+from typing import Any, Dict, List, Tuple
+
+from google.cloud import bigquery
+
+# Filterable columns of the BigQuery `startups` table and their types
+STARTUP_COLUMNS: Dict[str, str] = {
+    "id": "INT64",
+    "name": "STRING",
+    "website": "STRING",
+    "status": "STRING",
+    "location": "STRING",
+    "industry": "STRING",
+    "leading_investor": "STRING",
+    "funding_stage": "STRING",
+    "pitch_deck_url": "STRING",
+    "is_unicorn": "BOOL",
+    "founded_year": "INT64",
+    "number_of_employees": "INT64",
+    "total_funding_raised": "FLOAT64",
+    "total_valuation": "FLOAT64",
+    "tam": "FLOAT64",
+    "arr": "FLOAT64",
+}
+
+# List/search results leave out the large raw_data column (kept for single-startup reads)
+STARTUP_LIST_PROJECTION = "* EXCEPT (raw_data)"
+
+_PYTHON_TYPES = {
+    "STRING": (str,),
+    "INT64": (int,),
+    "FLOAT64": (int, float),
+    "BOOL": (bool,),
+}
+
+
+def _escape_like(value: str) -> str:
+    """Make LIKE wildcards in user input match literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class QueryBuilder:
+    def __init__(self, table: str, columns: Dict[str, str]):
+        self.table = table
+        self.columns = columns
+        # column -> (SQL condition, query parameter)
+        self._filters: Dict[str, Tuple[str, Any]] = {}
+
+    def _column_type(self, column: str) -> str:
+        if column not in self.columns:
+            raise ValueError(f"Unknown filter column: {column}")
+        return self.columns[column]
+
+    def _check_value(self, column: str, value: Any) -> None:
+        column_type = self._column_type(column)
+        allowed = _PYTHON_TYPES[column_type]
+        # bool is an int subclass; only BOOL columns accept it
+        if (isinstance(value, bool) and column_type != "BOOL") or not isinstance(value, allowed):
+            raise ValueError(f"Invalid value for {column}: expected {column_type}")
+
+    def contains(self, column: str, value: str) -> "QueryBuilder":
+        """Case-insensitive substring match on a STRING column."""
+        self._check_value(column, value)
+        if self.columns[column] != "STRING":
+            raise ValueError(f"Substring filter is only supported on text columns, not {column}")
+        self._filters[column] = (
+            f"LOWER({column}) LIKE @{column}",
+            bigquery.ScalarQueryParameter(column, "STRING", f"%{_escape_like(value.lower())}%"),
+        )
+        return self
+
+    def equals(self, column: str, value: Any) -> "QueryBuilder":
+        self._check_value(column, value)
+        self._filters[column] = (
+            f"{column} = @{column}",
+            bigquery.ScalarQueryParameter(column, self.columns[column], value),
+        )
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "QueryBuilder":
+        for value in values:
+            self._check_value(column, value)
+        self._filters[column] = (
+            f"{column} IN UNNEST(@{column})",
+            bigquery.ArrayQueryParameter(column, self.columns[column], list(values)),
+        )
+        return self
+
+    def where(self, column: str, value: Any) -> "QueryBuilder":
+        """Filter with the operator implied by the column type and value shape."""
+        if isinstance(value, (list, tuple)):
+            return self.in_(column, list(value))
+        if self._column_type(column) == "STRING":
+            return self.contains(column, value)
+        return self.equals(column, value)
+
+    def build(self, limit: int, select: str = "*") -> Tuple[str, bigquery.QueryJobConfig]:
+        conditions = [self._filters[column][0] for column in sorted(self._filters)]
+        params = [self._filters[column][1] for column in sorted(self._filters)]
+        params.append(bigquery.ScalarQueryParameter("limit", "INT64", limit))
+
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT {select}\nFROM `{self.table}`\n{where_clause}\nLIMIT @limit"
+        return query, bigquery.QueryJobConfig(query_parameters=params)
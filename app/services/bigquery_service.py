@@ -1,21 +1,71 @@
 import os
-from typing import List, Optional, Dict, Any
+import functools
+import hashlib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Dict, Any, Tuple, TypeVar
 from google.cloud import bigquery
+import orjson
+import pyarrow as pa
 from app.schemas.startup import StartupCreate, StartupEvaluationCreate
 from app.db.models.startup import StartupStatus
 import asyncio
 import json
-import re
 from datetime import datetime
 import logging
-from google.cloud import aiplatform
-import vertexai
-from vertexai.generative_models import GenerativeModel
+from app.core import deadline
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.schemas.ai_output import DocumentExtractionBasicOutput, DocumentExtractionOutput
+from app.services.bigquery_outbox import DocumentAnalysisOutbox
+from app.services.bigquery_writer import BigQueryBatchWriter
+from app.services.bigquery_query import STARTUP_COLUMNS, STARTUP_LIST_PROJECTION, QueryBuilder
+from app.services.context_packer import estimate_tokens
+from app.services.llm_gateway import llm_gateway
+from app.services.model_router import route_model
+from app.utils.arrow_format import json_default
+from app.utils.cache import MemoryLRUBackend, TieredCache
+from app.utils.farmhash import farm_fingerprint
+from app.utils.gemini_schema import to_response_schema
+from app.utils.json_extract import extract_json
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Upper bound on the parameters sent with one batched startup MERGE (the request limit is 10 MB)
+MERGE_PARAM_BUDGET_BYTES = 4 * 1024 * 1024
+
+# Vertex SDK form of the extraction schemas (no propertyOrdering)
+DOCUMENT_EXTRACTION_SCHEMA = to_response_schema(DocumentExtractionOutput, property_ordering=False)
+DOCUMENT_EXTRACTION_BASIC_SCHEMA = to_response_schema(DocumentExtractionBasicOutput, property_ordering=False)
+
+# Static extraction instructions, sent as the system instruction (context-cached where supported)
+DOCUMENT_EXTRACTION_INSTRUCTIONS = """You are a business analyst. Extract structured information from the business document text you are given and return it as a valid JSON object.
+
+Instructions:
+1. Extract business information and format as JSON
+2. Use null for any missing information
+3. Return ONLY valid JSON, no explanations or markdown formatting
+4. Ensure all string values are properly quoted
+5. If you cannot find specific information, use null or "Unknown"
+
+Required JSON structure:
+{
+    "company_name": "Company name or Unknown",
+    "industry": "Industry sector or Unknown",
+    "founding_year": 2023,
+    "company_stage": "startup/early/growth/mature",
+    "key_products": ["product1", "product2"],
+    "target_market": "Target customer description",
+    "competitive_advantage": "Main competitive advantages",
+    "revenue_model": "Revenue generation method",
+    "funding_status": "Current funding situation",
+    "team_size": 10
+}"""
+
 
 class BigQueryService:
     def __init__(self):
@@ -23,16 +73,124 @@ class BigQueryService:
         self.dataset_name = "scopify"
         self.table_name = "startups"
         self.doc_analysis_table = "document_analysis"
-        
-        # Initialize Vertex AI with explicit credentials and settings
-        aiplatform.init(
-            project=settings.DOCAI_PROJECT_ID,
-            location="us-central1",  # Using a region where all models are available
-            staging_bucket=None
+        # Table handles (with schema), fetched once and reused
+        self._tables: Dict[str, bigquery.Table] = {}
+        self._doc_analysis_table_ready = False
+        # All blocking client calls run here, never on the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.BIGQUERY_EXECUTOR_WORKERS, thread_name_prefix="bigquery"
         )
-        
-        # Ensure document analysis table exists
+        # Read results keyed by table generation, query text and parameters; a write to a
+        # table bumps its generation so older entries are never read again
+        self._result_cache = TieredCache(
+            "bigquery_results",
+            [MemoryLRUBackend(max_entries=settings.BIGQUERY_CACHE_MAX_ENTRIES)],
+            ttl=settings.BIGQUERY_CACHE_TTL_SECONDS,
+        )
+        self._table_generations: Dict[str, int] = {}
+        metrics.register_gauge("bigquery_cache", self._result_cache.stats)
+        # Storage Read API client for columnar (Arrow) downloads; without it they page over REST
+        try:
+            from google.cloud import bigquery_storage
+
+            self._bqstorage_client = bigquery_storage.BigQueryReadClient()
+        except Exception as e:
+            logger.warning(f"BigQuery Storage Read API unavailable, large reads will page over REST: {e}")
+            self._bqstorage_client = None
+
+        # Ensure document analysis table exists (once; the service is created at app startup)
         self._ensure_doc_analysis_table_exists()
+
+        # Document analysis rows are inserted in micro-batches by a background writer
+        self.doc_analysis_writer = BigQueryBatchWriter(
+            self.client,
+            f"{self.client.project}.{self.dataset_name}.{self.doc_analysis_table}",
+            self.doc_analysis_table,
+        )
+        metrics.register_gauge("bigquery_writer", self.doc_analysis_writer.stats)
+
+        # Analyses are committed to Postgres first and drained to BigQuery by this worker
+        self.outbox = DocumentAnalysisOutbox(self)
+        metrics.register_gauge("bigquery_outbox", self.outbox.stats)
+
+    def close(self) -> None:
+        """Drain queued inserts, wait for in-flight BigQuery calls and release the executor and client."""
+        self.doc_analysis_writer.close()
+        self._executor.shutdown(wait=True)
+        self.client.close()
+
+    async def _run(self, operation: str, fn: Callable[..., T], *args: Any) -> T:
+        """Run a blocking client call on the BigQuery executor, recording bigquery.calls / bigquery.latency."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+        except Exception:
+            metrics.incr("bigquery.calls", operation=operation, outcome="error")
+            raise
+        finally:
+            metrics.observe("bigquery.latency", (time.perf_counter() - started) * 1000, operation=operation)
+        metrics.incr("bigquery.calls", operation=operation, outcome="ok")
+        return result
+
+    async def _run_query(
+        self, operation: str, query: str, job_config: Optional[bigquery.QueryJobConfig] = None
+    ) -> List[Dict[str, Any]]:
+        """Run a query to completion off the event loop and return its rows as dicts."""
+        def run() -> List[Dict[str, Any]]:
+            # Iterating the result may fetch further pages, so it stays on the executor too
+            return [dict(row.items()) for row in self.client.query(query, job_config=job_config).result()]
+
+        return await self._run(operation, run)
+
+    def _query_to_arrow(self, query: str, job_config: Optional[bigquery.QueryJobConfig] = None) -> pa.Table:
+        """Blocking: run a query and download its result as an Arrow table (Storage Read API when available)."""
+        return self.client.query(query, job_config=job_config).to_arrow(
+            bqstorage_client=self._bqstorage_client, create_bqstorage_client=False
+        )
+
+    async def _run_arrow_query(
+        self, operation: str, query: str, job_config: Optional[bigquery.QueryJobConfig] = None
+    ) -> pa.Table:
+        return await self._run(operation, self._query_to_arrow, query, job_config)
+
+    async def _cached_query(
+        self, operation: str, table_name: str, query: str, job_config: Optional[bigquery.QueryJobConfig] = None
+    ) -> List[Dict[str, Any]]:
+        """_run_query served from the result cache when `table_name` has not been written since."""
+        if not settings.BIGQUERY_CACHE_ENABLED:
+            return await self._run_query(operation, query, job_config)
+
+        params = [param.to_api_repr() for param in job_config.query_parameters] if job_config else []
+        key = hashlib.sha256(orjson.dumps(
+            [table_name, self._table_generations.get(table_name, 0), query, params],
+            option=orjson.OPT_SORT_KEYS,
+            default=str,
+        )).hexdigest()
+        cached = self._result_cache.get(key)
+        if cached is not None:
+            return orjson.loads(cached)
+
+        # Columnar download, converted to dicts in bulk
+        rows = await self._run(operation, lambda: self._query_to_arrow(query, job_config).to_pylist())
+        serialized = orjson.dumps(rows, default=json_default)
+        self._result_cache.set(key, serialized.decode("utf-8"))
+        # Return the decoded form a cache hit would, so values have the same types either way
+        return orjson.loads(serialized)
+
+    def _invalidate_cached_reads(self, *table_names: str) -> None:
+        """Drop cached reads of tables that were just written."""
+        for table_name in table_names:
+            self._table_generations[table_name] = self._table_generations.get(table_name, 0) + 1
+            metrics.incr("bigquery.cache_invalidations", table=table_name)
+
+    def _get_table(self, table_name: str) -> bigquery.Table:
+        """Table handle for `table_name` in the dataset, fetched on first use."""
+        table = self._tables.get(table_name)
+        if table is None:
+            table = self.client.get_table(f"{self.client.project}.{self.dataset_name}.{table_name}")
+            self._tables[table_name] = table
+        return table
     
     def _construct_gcs_url(self, file_name: str) -> str:
         """Construct GCS URL based on the standard file storage pattern"""
@@ -71,16 +229,7 @@ class BigQueryService:
             logger.info(f"Using provided GCS URL: {gcs_url}")
         
         try:
-            # Initialize Vertex AI for this request
             try:
-                vertexai.init(
-                    project=settings.DOCAI_PROJECT_ID,
-                    location="us-central1"
-                )
-                
-                # Initialize Gemini Pro model
-                model = GenerativeModel("gemini-2.0-flash-exp")  # Using more stable model
-                
                 # Create clear, structured prompt with better formatting
                 text_content = vision_result.get('text', '').strip()
                 
@@ -94,111 +243,81 @@ class BigQueryService:
                         "raw_vision_data": vision_result
                     }
                 
-                prompt = f"""You are a business analyst. Extract structured information from the following business document text and return it as a valid JSON object.
-
-Document text:
+                prompt = f"""Document text:
 {text_content}
 
-Instructions:
-1. Extract business information and format as JSON
-2. Use null for any missing information
-3. Return ONLY valid JSON, no explanations or markdown formatting
-4. Ensure all string values are properly quoted
-5. If you cannot find specific information, use null or "Unknown"
+JSON response:"""
 
-Required JSON structure:
-{{
-    "company_name": "Company name or Unknown",
-    "industry": "Industry sector or Unknown", 
-    "founding_year": 2023,
-    "company_stage": "startup/early/growth/mature",
-    "key_products": ["product1", "product2"],
-    "target_market": "Target customer description",
-    "competitive_advantage": "Main competitive advantages",
-    "revenue_model": "Revenue generation method",
-    "funding_status": "Current funding situation",
-    "team_size": 10
-}}
+                generation_config = {
+                    "temperature": 0.1,  # Lower temperature for more consistent output
+                    "max_output_tokens": 2048,
+                    "top_p": 0.8,
+                    "top_k": 40,
+                    "response_mime_type": "application/json",  # Force JSON response
+                    "response_schema": DOCUMENT_EXTRACTION_SCHEMA  # ...in the extraction shape
+                }
 
-JSON response:"""
+                try:
+                    logger.info(f"Analyzing {file_name}")
 
-                # Try to get response with better error handling
-                max_retries = 3
-                retry_count = 0
-                last_error = None
-
-                while retry_count < max_retries:
-                    try:
-                        logger.info(f"Attempting analysis {retry_count + 1}/{max_retries} for {file_name}")
-                        
-                        # Get response with timeout using Gemini
-                        response = await asyncio.wait_for(
-                            model.generate_content_async(
-                                prompt,
-                                generation_config={
-                                    "temperature": 0.1,  # Lower temperature for more consistent output
-                                    "max_output_tokens": 2048,
-                                    "top_p": 0.8,
-                                    "top_k": 40,
-                                    "response_mime_type": "application/json"  # Force JSON response
-                                }
-                            ),
-                            timeout=45  # Increased timeout
-                        )
-                        
-                        # Better response handling
-                        if not response or not hasattr(response, 'text'):
-                            raise ValueError("Empty response from AI model")
-                        
-                        response_text = response.text.strip()
-                        logger.info(f"Raw response length: {len(response_text)} chars")
-                        
-                        if not response_text:
-                            raise ValueError("Empty response text from AI model")
-                        
-                        # Clean and extract JSON from response
-                        structured_data = self._extract_and_parse_json(response_text)
-                        
-                        if not structured_data:
-                            raise ValueError("Could not extract valid JSON from response")
-                        
-                        # Validate and clean the structured data
-                        structured_data = self._validate_and_clean_data(structured_data)
-
-                        # Ensure pitch_deck_url is included with the GCS URL
-                        structured_data["pitch_deck_url"] = gcs_url
-                        
-                        # Start BigQuery storage in background
-                        asyncio.create_task(
-                            self._store_in_bigquery(vision_result, file_name, structured_data)
-                        )
-                        
-                        logger.info(f"Successfully analyzed document: {file_name}")
-                        return structured_data
-                        
-                    except asyncio.TimeoutError:
-                        last_error = "Request timeout - model took too long to respond"
-                        logger.warning(f"Attempt {retry_count + 1}: {last_error}")
-                        
-                    except Exception as e:
-                        last_error = f"Analysis error: {str(e)}"
-                        logger.warning(f"Attempt {retry_count + 1}: {last_error}")
-                        logger.debug(f"Full error details: {repr(e)}")
-                    
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        await asyncio.sleep(2 ** retry_count)  # Exponential backoff
+                    # Transient errors are retried by the gateway; unchanged documents are
+                    # served from the response cache (only responses that contain JSON are cached)
+                    route = route_model(
+                        "document_extraction", estimate_tokens(DOCUMENT_EXTRACTION_INSTRUCTIONS + prompt)
+                    )
+                    response_text = await llm_gateway.generate(
+                        route.model,
+                        prompt,
+                        generation_config,
+                        backend="vertex",
+                        system_instruction=DOCUMENT_EXTRACTION_INSTRUCTIONS,
+                        is_cacheable=lambda text: extract_json(text) is not None,
+                    )
+                    logger.info(f"Raw response length: {len(response_text)} chars")
+
+                    if not response_text:
+                        raise ValueError("Empty response text from AI model")
+
+                    # Clean and extract JSON from response
+                    structured_data = extract_json(response_text)
+
+                    if not structured_data:
+                        raise ValueError("Could not extract valid JSON from response")
+
+                    # Validate and clean the structured data
+                    structured_data = self._validate_and_clean_data(structured_data)
+
+                    # Ensure pitch_deck_url is included with the GCS URL
+                    structured_data["pitch_deck_url"] = gcs_url
+
+                    # Durably queued for BigQuery; the outbox worker does the writes
+                    await self._enqueue_document_analysis(vision_result, file_name, structured_data)
+
+                    logger.info(f"Successfully analyzed document: {file_name}")
+                    return structured_data
+
+                except asyncio.TimeoutError:
+                    last_error = "Request timeout - model took too long to respond"
+                    logger.warning(last_error)
 
-                # If all retries failed, try with fallback model
-                logger.warning(f"Primary model failed, trying fallback for {file_name}")
-                fallback_result = await self._try_fallback_analysis(text_content, vision_result, file_name, gcs_url)
-                if fallback_result:
-                    return fallback_result
+                except Exception as e:
+                    last_error = f"Analysis error: {str(e)}"
+                    logger.warning(last_error)
+                    logger.debug(f"Full error details: {repr(e)}")
+
+                # If the primary analysis failed, try with fallback model (if the request has time left)
+                if deadline.can_retry(settings.LLM_MIN_ATTEMPT_SECONDS):
+                    logger.warning(f"Primary model failed, trying fallback for {file_name}")
+                    fallback_result = await self._try_fallback_analysis(text_content, vision_result, file_name, gcs_url)
+                    if fallback_result:
+                        return fallback_result
+                else:
+                    logger.warning(f"Primary model failed and no time is left for a fallback: {file_name}")
 
                 # If everything failed, return structured error
-                logger.error(f"Failed to process document after {max_retries} attempts: {last_error}")
+                logger.error(f"Failed to process document: {last_error}")
                 return {
-                    "error": f"Failed to analyze document after {max_retries} attempts: {last_error}",
+                    "error": f"Failed to analyze document: {last_error}",
                     "company_name": "Analysis Failed",
                     "industry": "Unknown",
                     "pitch_deck_url": gcs_url,  # Include GCS URL even in error case
@@ -225,64 +344,19 @@ JSON response:"""
                 "raw_vision_data": vision_result
             }
 
-    def _extract_and_parse_json(self, response_text: str) -> Optional[Dict[str, Any]]:
-        """Extract and parse JSON from AI response with multiple strategies"""
-        try:
-            # Strategy 1: Direct JSON parsing
-            if response_text.strip().startswith('{'):
-                return json.loads(response_text)
-            
-            # Strategy 2: Find JSON block within response
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                return json.loads(json_str)
-            
-            # Strategy 3: Look for JSON between code blocks
-            code_block_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response_text, re.DOTALL | re.IGNORECASE)
-            if code_block_match:
-                json_str = code_block_match.group(1)
-                return json.loads(json_str)
-            
-            # Strategy 4: Extract the largest JSON-like structure
-            brace_count = 0
-            start_idx = -1
-            for i, char in enumerate(response_text):
-                if char == '{':
-                    if start_idx == -1:
-                        start_idx = i
-                    brace_count += 1
-                elif char == '}':
-                    brace_count -= 1
-                    if brace_count == 0 and start_idx != -1:
-                        potential_json = response_text[start_idx:i+1]
-                        try:
-                            return json.loads(potential_json)
-                        except:
-                            continue
-            
-            return None
-            
-        except json.JSONDecodeError as e:
-            logger.warning(f"JSON decode error: {str(e)}")
-            return None
-        except Exception as e:
-            logger.warning(f"Error extracting JSON: {str(e)}")
-            return None
-
     def _validate_and_clean_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate and clean extracted data"""
-        # Ensure required fields exist
+        # Ensure required fields exist (the response schema allows nulls)
         cleaned_data = {
-            "company_name": str(data.get("company_name", "Unknown")).strip() or "Unknown",
-            "industry": str(data.get("industry", "Unknown")).strip() or "Unknown",
+            "company_name": str(data.get("company_name") or "Unknown").strip() or "Unknown",
+            "industry": str(data.get("industry") or "Unknown").strip() or "Unknown",
             "founding_year": None,
-            "company_stage": str(data.get("company_stage", "Unknown")).strip() or "Unknown",
+            "company_stage": str(data.get("company_stage") or "Unknown").strip() or "Unknown",
             "key_products": [],
-            "target_market": str(data.get("target_market", "Unknown")).strip() or "Unknown",
-            "competitive_advantage": str(data.get("competitive_advantage", "Unknown")).strip() or "Unknown", 
-            "revenue_model": str(data.get("revenue_model", "Unknown")).strip() or "Unknown",
-            "funding_status": str(data.get("funding_status", "Unknown")).strip() or "Unknown",
+            "target_market": str(data.get("target_market") or "Unknown").strip() or "Unknown",
+            "competitive_advantage": str(data.get("competitive_advantage") or "Unknown").strip() or "Unknown", 
+            "revenue_model": str(data.get("revenue_model") or "Unknown").strip() or "Unknown",
+            "funding_status": str(data.get("funding_status") or "Unknown").strip() or "Unknown",
             "team_size": None
         }
         
@@ -326,9 +400,6 @@ JSON response:"""
     async def _try_fallback_analysis(self, text_content: str, vision_result: Dict[str, Any], file_name: str, gcs_url: str = None) -> Optional[Dict[str, Any]]:
         """Try simpler analysis as fallback"""
         try:
-            # Use Gemini Flash as fallback
-            model = GenerativeModel("gemini-2.0-flash-exp")
-            
             # Simpler prompt for fallback
             simple_prompt = f"""Extract basic company information from this text and return as JSON:
 
@@ -337,20 +408,25 @@ JSON response:"""
 Return only this JSON format:
 {{"company_name": "name or Unknown", "industry": "industry or Unknown"}}"""
             
-            response = await asyncio.wait_for(
-                model.generate_content_async(
-                    simple_prompt,
-                    generation_config={
-                        "temperature": 0.0,
-                        "max_output_tokens": 256,
-                        "response_mime_type": "application/json"
-                    }
-                ),
-                timeout=30
+            generation_config = {
+                "temperature": 0.0,
+                "max_output_tokens": 256,
+                "response_mime_type": "application/json",
+                "response_schema": DOCUMENT_EXTRACTION_BASIC_SCHEMA
+            }
+
+            route = route_model("document_extraction", estimate_tokens(simple_prompt))
+            response_text = await llm_gateway.generate(
+                route.model,
+                simple_prompt,
+                generation_config,
+                backend="vertex",
+                timeout=30,
+                is_cacheable=lambda text: extract_json(text) is not None,
             )
-            
-            if response and hasattr(response, 'text') and response.text.strip():
-                fallback_data = self._extract_and_parse_json(response.text.strip())
+
+            if response_text:
+                fallback_data = extract_json(response_text)
                 if fallback_data:
                     # Fill in missing fields
                     result = {
@@ -368,11 +444,8 @@ Return only this JSON format:
                         "fallback_analysis": True
                     }
                     
-                    # Store in BigQuery synchronously
-                    try:
-                        self._store_in_bigquery_sync(vision_result, file_name, result)
-                    except Exception as storage_error:
-                        logger.error(f"Failed to store fallback result: {str(storage_error)}")
+                    # Queue for BigQuery before returning
+                    await self._enqueue_document_analysis(vision_result, file_name, result)
                     
                     logger.info(f"Fallback analysis successful for {file_name}")
                     return result
@@ -427,239 +500,245 @@ Return only this JSON format:
                 logger.error(f"Even fallback serialization failed: {str(fallback_error)}")
                 return json.dumps({"error": f"Serialization failed: {str(e)}", "fallback_error": str(fallback_error)})
 
-    def _store_in_bigquery_sync(self, vision_result: Dict[str, Any], file_name: str, structured_data: Dict[str, Any]) -> None:
-        """Synchronous method to store document analysis in BigQuery - no datetime serialization issues"""
+    async def _enqueue_document_analysis(
+        self,
+        vision_result: Dict[str, Any],
+        file_name: str,
+        structured_data: Dict[str, Any]
+    ) -> None:
+        """Commit the analysis to the Postgres outbox; the outbox worker writes it to BigQuery."""
         try:
-            # Create timestamp as string immediately - never use datetime objects
-            timestamp_str = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f UTC')[:-7] + ' UTC'
-            unique_id = str(int(datetime.utcnow().timestamp() * 1000000))
-            
-            # Pre-process raw_data to remove any datetime objects
-            safe_vision_result = self._clean_datetime_objects(vision_result)
-            
-            # Get the pitch_deck_url from structured_data
-            pitch_deck_url = structured_data.get("pitch_deck_url")
-            
-            # Create completely safe row data - all strings and basic types only
-            safe_row = {
-                "id": unique_id,
-                "file_name": str(file_name) if file_name else "",
-                "file_type": None,
-                "analysis_timestamp": timestamp_str,
-                "raw_data": json.dumps(safe_vision_result, default=str),  # Force string conversion for any remaining objects
-                "company_name": str(structured_data.get("company_name")) if structured_data.get("company_name") else None,
-                "industry": str(structured_data.get("industry")) if structured_data.get("industry") else None,
-                "founding_year": int(structured_data["founding_year"]) if structured_data.get("founding_year") and str(structured_data["founding_year"]).isdigit() else None,
-                "company_stage": str(structured_data.get("company_stage")) if structured_data.get("company_stage") else None,
-                "key_products": json.dumps(structured_data.get("key_products", []) if structured_data.get("key_products") else []),
-                "target_market": str(structured_data.get("target_market")) if structured_data.get("target_market") else None,
-                "competitive_advantage": str(structured_data.get("competitive_advantage")) if structured_data.get("competitive_advantage") else None,
-                "revenue_model": str(structured_data.get("revenue_model")) if structured_data.get("revenue_model") else None,
-                "funding_status": str(structured_data.get("funding_status")) if structured_data.get("funding_status") else None,
-                "team_size": int(structured_data["team_size"]) if structured_data.get("team_size") and str(structured_data["team_size"]).isdigit() else None,
-                "startup_id": None,
-                "processing_status": "completed" if not structured_data.get("error") else "error",
-                "error_message": str(structured_data.get("error")) if structured_data.get("error") else None
-            }
-            
-            # Ensure table exists
-            self._ensure_doc_analysis_table_exists()
-            
-            # Get table reference
-            table_ref = self.client.dataset(self.dataset_name).table(self.doc_analysis_table)
-            
-            # Insert using JSON method with completely clean data
-            errors = self.client.insert_rows_json(table_ref, [safe_row])
-            
-            if errors:
-                logger.error(f"BigQuery insertion failed: {errors}")
-                # Try with even more minimal data
-                minimal_row = {
-                    "id": unique_id,
-                    "file_name": str(file_name) if file_name else "unknown",
-                    "analysis_timestamp": timestamp_str,
-                    "raw_data": "{}",
-                    "company_name": str(structured_data.get("company_name", "Unknown")),
-                    "industry": str(structured_data.get("industry", "Unknown")),
-                    "processing_status": "error",
-                    "error_message": f"Original insertion failed: {str(errors)}"
-                }
-                
-                retry_errors = self.client.insert_rows_json(table_ref, [minimal_row])
-                if retry_errors:
-                    logger.error(f"Minimal insertion also failed: {retry_errors}")
-                else:
-                    logger.info(f"Successfully stored minimal data for: {file_name}")
-            else:
-                logger.info(f"Successfully stored document data: {file_name}")
-                
+            await self.outbox.enqueue(self._outbox_fields(vision_result, file_name, structured_data))
         except Exception as e:
-            logger.error(f"Error in synchronous BigQuery storage: {str(e)}")
-            logger.error(f"Error type: {type(e)}")
-            import traceback
-            logger.error(f"Full traceback: {traceback.format_exc()}")
-    
-    def _clean_datetime_objects(self, obj: Any) -> Any:
-        """Recursively clean datetime objects from nested structures"""
-        if isinstance(obj, datetime):
-            return obj.isoformat() + 'Z'
-        elif isinstance(obj, dict):
-            return {key: self._clean_datetime_objects(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [self._clean_datetime_objects(item) for item in obj]
-        elif hasattr(obj, 'isoformat'):  # Other date-like objects
-            return obj.isoformat()
-        elif hasattr(obj, '__dict__'):  # Custom objects
-            return str(obj)
-        else:
-            return obj
+            metrics.incr("bigquery.outbox", outcome="enqueue_error")
+            logger.error(f"Failed to queue document analysis for {file_name}: {str(e)}", exc_info=True)
 
-    async def _store_in_bigquery(
+    def _outbox_fields(
         self,
         vision_result: Dict[str, Any],
         file_name: str,
         structured_data: Dict[str, Any]
-    ) -> None:
-        """Background task to store document analysis in BigQuery, linking to startups table"""
+    ) -> Dict[str, Any]:
+        """Outbox row for an analysis, normalized the way it will be written to BigQuery"""
+        # Round-trip through the safe serializer so the JSON column never sees datetimes
         try:
-            analysis_timestamp = datetime.utcnow()
+            raw_data = json.loads(self._safe_json_dumps(vision_result))
+        except Exception as raw_error:
+            logger.error(f"Raw data serialization failed: {str(raw_error)}")
+            raw_data = {"error": "Could not serialize vision result", "type": str(type(vision_result))}
 
-            # Serialize raw_data safely
-            try:
-                raw_data_str = self._safe_json_dumps(vision_result)
-            except Exception as raw_error:
-                logger.error(f"Raw data serialization failed: {str(raw_error)}")
-                raw_data_str = json.dumps(
-                    {"error": "Could not serialize vision result", "type": str(type(vision_result))}
-                )
+        return {
+            # BigQuery id and insert ID: unique across instances, fixed for every retry
+            "bigquery_row_id": uuid.uuid4().hex,
+            "file_name": str(file_name) if file_name else "",
+            "analysis_timestamp": datetime.utcnow(),
+            "raw_data": raw_data,
+            "company_name": str(structured_data.get("company_name")) if structured_data.get("company_name") else None,
+            "industry": str(structured_data.get("industry")) if structured_data.get("industry") else None,
+            "founding_year": int(structured_data["founding_year"]) if structured_data.get("founding_year") and str(structured_data["founding_year"]).isdigit() else None,
+            "company_stage": str(structured_data.get("company_stage")) if structured_data.get("company_stage") else None,
+            "key_products": structured_data.get("key_products") or [],
+            "target_market": str(structured_data.get("target_market")) if structured_data.get("target_market") else None,
+            "competitive_advantage": str(structured_data.get("competitive_advantage")) if structured_data.get("competitive_advantage") else None,
+            "revenue_model": str(structured_data.get("revenue_model")) if structured_data.get("revenue_model") else None,
+            "funding_status": str(structured_data.get("funding_status")) if structured_data.get("funding_status") else None,
+            "team_size": int(structured_data["team_size"]) if structured_data.get("team_size") and str(structured_data["team_size"]).isdigit() else None,
+            "pitch_deck_url": structured_data.get("pitch_deck_url"),
+        }
 
-            # Get the pitch_deck_url from structured_data (it should already be set)
-            pitch_deck_url = structured_data.get("pitch_deck_url")
-
-            # Build safe structured row
-            safe_row = {
-                "file_name": str(file_name) if file_name else "",
-                "company_name": str(structured_data.get("company_name")) if structured_data.get("company_name") else None,
-                "industry": str(structured_data.get("industry")) if structured_data.get("industry") else None,
-                "founding_year": int(structured_data["founding_year"]) if structured_data.get("founding_year") and str(structured_data["founding_year"]).isdigit() else None,
-                "company_stage": str(structured_data.get("company_stage")) if structured_data.get("company_stage") else None,
-                "key_products": json.dumps(structured_data.get("key_products", []) if structured_data.get("key_products") else []),
-                "target_market": str(structured_data.get("target_market")) if structured_data.get("target_market") else None,
-                "competitive_advantage": str(structured_data.get("competitive_advantage")) if structured_data.get("competitive_advantage") else None,
-                "revenue_model": str(structured_data.get("revenue_model")) if structured_data.get("revenue_model") else None,
-                "funding_status": str(structured_data.get("funding_status")) if structured_data.get("funding_status") else None,
-                "team_size": int(structured_data["team_size"]) if structured_data.get("team_size") and str(structured_data["team_size"]).isdigit() else None,
-                "processing_status": "completed" if not structured_data.get("error") else "error",
-                "error_message": str(structured_data.get("error")) if structured_data.get("error") else None
-            }
+    async def _sync_document_analyses(self, records: List[Dict[str, Any]]) -> List[Optional[BaseException]]:
+        """
+        Write a batch of outbox rows to BigQuery: one MERGE upserts all their startups,
+        then each document is inserted linked to its startup. Returns the error for each
+        record (None if it was written) so the outbox retries only the failed ones.
+        """
+        try:
+            startup_ids = await self._merge_startups(records)
+        except Exception as e:
+            logger.error(f"Startup upsert failed for {len(records)} documents: {str(e)}")
+            return [e] * len(records)
 
-            loop = asyncio.get_event_loop()
+        # Concurrent so the document inserts share writer batches
+        results = await asyncio.gather(
+            *(self._insert_document_analysis(record, startup_ids.get(record["id"])) for record in records),
+            return_exceptions=True,
+        )
+        return [result if isinstance(result, BaseException) else None for result in results]
 
-            # ✅ 1. Insert (or upsert) into startups table
-            try:
-                startup_query = f"""
-                MERGE `{self.dataset_name}.startups` T
-                USING (SELECT @company_name AS company_name, @industry AS industry, @founding_year AS founded_year) S
-                ON LOWER(T.name) = LOWER(S.company_name)
-                WHEN MATCHED THEN
-                UPDATE SET 
-                    T.industry = S.industry, 
-                    T.founded_year = S.founded_year, 
-                    T.updated_at = CURRENT_TIMESTAMP(),
-                    T.raw_data = @raw_data,
-                    T.pitch_deck_url = @pitch_deck_url
-                WHEN NOT MATCHED THEN
-                INSERT (id, name, industry, founded_year, created_at, updated_at, raw_data, pitch_deck_url)
-                VALUES (
-                    CAST(FARM_FINGERPRINT(S.company_name) AS INT64),
-                    S.company_name, 
-                    S.industry, 
-                    S.founded_year, 
-                    CURRENT_TIMESTAMP(),
-                    CURRENT_TIMESTAMP(),
-                    @raw_data,
-                    @pitch_deck_url
-                )
-                """
-
-                startup_job_config = bigquery.QueryJobConfig(
-                    query_parameters=[
-                        bigquery.ScalarQueryParameter("company_name", "STRING", safe_row["company_name"]),
-                        bigquery.ScalarQueryParameter("industry", "STRING", safe_row["industry"]),
-                        bigquery.ScalarQueryParameter("founding_year", "INT64", safe_row["founding_year"]),
-                        bigquery.ScalarQueryParameter("raw_data", "STRING", raw_data_str),
-                        bigquery.ScalarQueryParameter("pitch_deck_url", "STRING", pitch_deck_url)
-                    ]
-                )
+    async def _merge_startups(self, records: List[Dict[str, Any]]) -> Dict[int, int]:
+        """
+        Upsert the startups named by `records` with MERGE over UNNEST(@startups), one
+        statement per MERGE_PARAM_BUDGET_BYTES of parameters. Returns outbox id -> startup id.
 
-                await loop.run_in_executor(
-                    None, lambda: self.client.query(startup_query, job_config=startup_job_config).result()
-                )
+        New startups get id FARM_FINGERPRINT(name), computed here rather than in SQL. Rows
+        are matched on LOWER(name): the first spelling in the batch is the one inserted, the
+        latest document's fields win. A startup that already existed (possibly under another
+        spelling) keeps its own id, so the ids are read back with one SELECT for the batch.
+        """
+        # One source row per startup; MERGE rejects several source rows matching one target row
+        startups: Dict[str, Dict[str, Any]] = {}
+        record_keys: Dict[int, str] = {}
+        for record in records:
+            if not record["company_name"]:
+                continue
+            key = record["company_name"].lower()
+            name = startups[key]["company_name"] if key in startups else record["company_name"]
+            startups[key] = {
+                "id": farm_fingerprint(name),
+                "company_name": name,
+                "industry": record["industry"],
+                "founded_year": record["founding_year"],
+                "raw_data": self._safe_json_dumps(record["raw_data"] or {}),
+                "pitch_deck_url": record["pitch_deck_url"],
+            }
+            record_keys[record["id"]] = key
+        if not startups:
+            return {}
 
-                # Fetch the startup_id (just inserted or existing)
-                get_startup_query = f"""
-                SELECT id FROM `{self.dataset_name}.startups`
-                WHERE LOWER(name) = LOWER(@company_name)
-                LIMIT 1
-                """
-                get_startup_job_config = bigquery.QueryJobConfig(
-                    query_parameters=[
-                        bigquery.ScalarQueryParameter("company_name", "STRING", safe_row["company_name"]),
-                    ]
-                )
-                startup_result = await loop.run_in_executor(
-                    None, lambda: self.client.query(get_startup_query, job_config=get_startup_job_config).result()
-                )
-                startup_rows = [dict(row.items()) for row in startup_result]
-                startup_id = startup_rows[0]["id"] if startup_rows else None
+        merge_query = f"""
+        MERGE `{self.dataset_name}.startups` T
+        USING UNNEST(@startups) S
+        ON LOWER(T.name) = LOWER(S.company_name)
+        WHEN MATCHED THEN
+        UPDATE SET 
+            T.id = IFNULL(T.id, S.id),
+            T.industry = S.industry, 
+            T.founded_year = S.founded_year, 
+            T.updated_at = CURRENT_TIMESTAMP(),
+            T.raw_data = S.raw_data,
+            T.pitch_deck_url = S.pitch_deck_url
+        WHEN NOT MATCHED THEN
+        INSERT (id, name, industry, founded_year, created_at, updated_at, raw_data, pitch_deck_url)
+        VALUES (
+            S.id,
+            S.company_name, 
+            S.industry, 
+            S.founded_year, 
+            CURRENT_TIMESTAMP(),
+            CURRENT_TIMESTAMP(),
+            S.raw_data,
+            S.pitch_deck_url
+        )
+        """
 
-            except Exception as startup_error:
-                logger.error(f"Startup insert/upsert failed: {str(startup_error)}")
-                startup_id = None
+        # raw_data can be large; keep each statement's parameters well under the request limit
+        chunk: List[Dict[str, Any]] = []
+        chunk_bytes = 0
+        chunks = [chunk]
+        for startup in startups.values():
+            size = len(startup["raw_data"]) + len(startup["pitch_deck_url"] or "")
+            if chunk and chunk_bytes + size > MERGE_PARAM_BUDGET_BYTES:
+                chunk = []
+                chunk_bytes = 0
+                chunks.append(chunk)
+            chunk.append(startup)
+            chunk_bytes += size
 
-            # ✅ 2. Insert into document_analysis with startup_id
-            try:
-                table_ref = self.client.dataset(self.dataset_name).table(self.doc_analysis_table)
-                table = await loop.run_in_executor(None, lambda: self.client.get_table(table_ref))
-
-                row_tuple = (
-                    str(int(analysis_timestamp.timestamp() * 1000000)),  # id
-                    safe_row["file_name"],
-                    None,  # file_type
-                    analysis_timestamp,
-                    raw_data_str,
-                    safe_row["company_name"],
-                    safe_row["industry"],
-                    safe_row["founding_year"],
-                    safe_row["company_stage"],
-                    safe_row["key_products"],
-                    safe_row["target_market"],
-                    safe_row["competitive_advantage"],
-                    safe_row["revenue_model"],
-                    safe_row["funding_status"],
-                    safe_row["team_size"],
-                    startup_id,  # ✅ foreign key reference
-                    safe_row["processing_status"],
-                    safe_row["error_message"],
-                )
+        for chunk in chunks:
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[
+                    bigquery.ArrayQueryParameter(
+                        "startups",
+                        "STRUCT",
+                        [
+                            bigquery.StructQueryParameter(
+                                None,
+                                bigquery.ScalarQueryParameter("id", "INT64", startup["id"]),
+                                bigquery.ScalarQueryParameter("company_name", "STRING", startup["company_name"]),
+                                bigquery.ScalarQueryParameter("industry", "STRING", startup["industry"]),
+                                bigquery.ScalarQueryParameter("founded_year", "INT64", startup["founded_year"]),
+                                bigquery.ScalarQueryParameter("raw_data", "STRING", startup["raw_data"]),
+                                bigquery.ScalarQueryParameter("pitch_deck_url", "STRING", startup["pitch_deck_url"]),
+                            )
+                            for startup in chunk
+                        ],
+                    )
+                ]
+            )
+            await self._run_query("merge_startups", merge_query, job_config)
+        self._invalidate_cached_reads(self.table_name)
 
-                errors = await loop.run_in_executor(
-                    None, lambda: self.client.insert_rows(table, [row_tuple])
+        # Actual id of each startup, whether the MERGE inserted it or it already existed
+        ids_query = f"""
+        SELECT n AS name, ARRAY_AGG(T.id IGNORE NULLS LIMIT 1)[SAFE_OFFSET(0)] AS id
+        FROM UNNEST(@names) AS n
+        JOIN `{self.dataset_name}.startups` T ON LOWER(T.name) = LOWER(n)
+        GROUP BY n
+        """
+        ids_job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter(
+                    "names", "STRING", [startup["company_name"] for startup in startups.values()]
                 )
-                if errors:
-                    logger.error(f"BigQuery insertion errors: {errors}")
-                else:
-                    logger.info(f"Inserted document for '{safe_row['company_name']}' linked to startup {startup_id}")
+            ]
+        )
+        rows = await self._run_query("get_startup_ids", ids_query, ids_job_config)
+        ids_by_name = {row["name"]: row["id"] for row in rows}
 
-            except Exception as bq_error:
-                logger.error(f"BigQuery insert failed: {str(bq_error)}", exc_info=True)
+        startup_ids: Dict[int, int] = {}
+        for record_id, key in record_keys.items():
+            startup_id = ids_by_name.get(startups[key]["company_name"])
+            if startup_id is None:
+                # Never link a document to an id no startup row has
+                logger.warning(f"No startup id found for '{startups[key]['company_name']}' after MERGE")
+                continue
+            startup_ids[record_id] = startup_id
+        return startup_ids
 
-        except Exception as e:
-            logger.error(f"Error in BigQuery storage task: {str(e)}", exc_info=True)
+    async def _insert_document_analysis(self, record: Dict[str, Any], startup_id: Optional[int]) -> None:
+        """Insert one outbox row into document_analysis, linked to `startup_id`. Raises if it was not stored."""
+        raw_data_str = self._safe_json_dumps(record["raw_data"] or {})
+        row_id = record["bigquery_row_id"]
+
+        row = {
+            "id": row_id,
+            "file_name": record["file_name"],
+            "file_type": record["file_type"],
+            "analysis_timestamp": record["analysis_timestamp"].isoformat(),
+            "raw_data": raw_data_str,
+            "company_name": record["company_name"],
+            "industry": record["industry"],
+            "founding_year": record["founding_year"],
+            "company_stage": record["company_stage"],
+            "key_products": json.dumps(record["key_products"] or []),
+            "target_market": record["target_market"],
+            "competitive_advantage": record["competitive_advantage"],
+            "revenue_model": record["revenue_model"],
+            "funding_status": record["funding_status"],
+            "team_size": record["team_size"],
+            "startup_id": startup_id,  # ✅ foreign key reference
+            "processing_status": "completed",
+            "error_message": None,
+        }
+
+        # Queued for the next batch; the writer thread does the insert
+        future = await self._run("queue_document_analysis", self.doc_analysis_writer.submit, row, row_id)
+        errors = await asyncio.wrap_future(future)
+        if errors:
+            logger.error(f"BigQuery insertion failed for {record['file_name']}: {errors}")
+            # Try with even more minimal data
+            minimal_row = {
+                "id": row_id,
+                "file_name": record["file_name"] or "unknown",
+                "analysis_timestamp": record["analysis_timestamp"].isoformat(),
+                "raw_data": "{}",
+                "company_name": record["company_name"] or "Unknown",
+                "industry": record["industry"] or "Unknown",
+                "startup_id": startup_id,
+                "processing_status": "error",
+                "error_message": f"Original insertion failed: {str(errors)}"
+            }
+            future = await self._run("queue_document_analysis", self.doc_analysis_writer.submit, minimal_row, f"{row_id}-minimal")
+            retry_errors = await asyncio.wrap_future(future)
+            if retry_errors:
+                raise RuntimeError(f"Minimal insertion also failed: {retry_errors}")
+        self._invalidate_cached_reads(self.doc_analysis_table)
+        logger.info(f"Inserted document for '{record['company_name']}' linked to startup {startup_id}")
 
-        
     def _ensure_doc_analysis_table_exists(self):
         """Create the document analysis table if it doesn't exist"""
+        if self._doc_analysis_table_ready:
+            return
         try:
             # First, check if dataset exists
             try:
@@ -675,7 +754,7 @@ Return only this JSON format:
             # Now check if table exists
             table_id = f"{self.client.project}.{self.dataset_name}.{self.doc_analysis_table}"
             try:
-                self.client.get_table(table_id)
+                self._tables[self.doc_analysis_table] = self.client.get_table(table_id)
                 logger.info(f"Table {self.doc_analysis_table} exists")
             except Exception:
                 # Create table if it doesn't exist
@@ -702,13 +781,25 @@ Return only this JSON format:
                 
                 table = bigquery.Table(table_id, schema=schema)
                 table = self.client.create_table(table)
+                self._tables[self.doc_analysis_table] = table
                 logger.info(f"Created table {self.doc_analysis_table}")
-                
+
+            self._doc_analysis_table_ready = True
         except Exception as e:
             logger.error(f"Error ensuring table exists: {str(e)}")
             raise
 
     # ... rest of the methods remain the same
+    def _startups_query(
+        self, name: Optional[str], status: Optional[StartupStatus], limit: int
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        builder = QueryBuilder(f"{self.dataset_name}.{self.table_name}", STARTUP_COLUMNS)
+        if name:
+            builder.contains("name", name)
+        if status:
+            builder.equals("status", status.value)
+        return builder.build(limit, select=STARTUP_LIST_PROJECTION)
+
     async def fetch_startups(
         self,
         name: Optional[str] = None,
@@ -718,72 +809,44 @@ Return only this JSON format:
         """
         Fetch startups from BigQuery with optional filters
         """
-        query = f"""
-        SELECT *
-        FROM `{self.dataset_name}.{self.table_name}`
-        WHERE 1=1
-        """
-        
-        if name:
-            query += f"\nAND LOWER(name) LIKE LOWER('%{name}%')"
-            
-        if status:
-            query += f"\nAND status = '{status.value}'"
-            
-        query += f"\nLIMIT {limit}"
-        
-        query_job = self.client.query(query)
-        results = query_job.result()
-        
-        return [dict(row.items()) for row in results]
+        query, job_config = self._startups_query(name, status, limit)
+        return await self._cached_query("fetch_startups", self.table_name, query, job_config)
+
+    async def fetch_startups_arrow(
+        self,
+        name: Optional[str] = None,
+        status: Optional[StartupStatus] = None,
+        limit: int = 100
+    ) -> pa.Table:
+        """Same rows as fetch_startups as an Arrow table (uncached), for NDJSON / Arrow responses"""
+        query, job_config = self._startups_query(name, status, limit)
+        return await self._run_arrow_query("fetch_startups_arrow", query, job_config)
 
     async def fetch_startup_by_id(self, startup_id: int) -> Optional[Dict[str, Any]]:
         """
         Fetch a specific startup by ID
         """
-        query = f"""
-        SELECT *
-        FROM `{self.dataset_name}.{self.table_name}`
-        WHERE id = {startup_id}
-        LIMIT 1
-        """
-        
-        query_job = self.client.query(query)
-        results = query_job.result()
-        
-        for row in results:
-            return dict(row.items())
-        return None
+        query, job_config = (
+            QueryBuilder(f"{self.dataset_name}.{self.table_name}", STARTUP_COLUMNS)
+            .equals("id", startup_id)
+            .build(1)
+        )
+        rows = await self._cached_query("fetch_startup_by_id", self.table_name, query, job_config)
+        return rows[0] if rows else None
 
     async def search_startups(self, search_params: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
-        Advanced search with multiple parameters
+        Advanced search with multiple parameters.
+        Keys must be known startup columns (ValueError otherwise); text values match
+        as case-insensitive substrings, numbers and booleans exactly, lists with IN.
         """
-        query = f"""
-        SELECT *
-        FROM `{self.dataset_name}.{self.table_name}`
-        WHERE 1=1
-        """
-        
-        # Add dynamic filters based on search parameters
+        builder = QueryBuilder(f"{self.dataset_name}.{self.table_name}", STARTUP_COLUMNS)
         for key, value in search_params.items():
             if value is not None:
-                if isinstance(value, str):
-                    query += f"\nAND LOWER({key}) LIKE LOWER('%{value}%')"
-                elif isinstance(value, (int, float)):
-                    query += f"\nAND {key} = {value}"
-                elif isinstance(value, bool):
-                    query += f"\nAND {key} = {str(value).lower()}"
-                elif isinstance(value, list):
-                    formatted_values = [f"'{v}'" if isinstance(v, str) else str(v) for v in value]
-                    query += f"\nAND {key} IN ({','.join(formatted_values)})"
-
-        query += "\nLIMIT 100"  # Safety limit
-        
-        query_job = self.client.query(query)
-        results = query_job.result()
-        
-        return [dict(row.items()) for row in results]
+                builder.where(key, value)
+
+        query, job_config = builder.build(100, select=STARTUP_LIST_PROJECTION)  # Safety limit
+        return await self._cached_query("search_startups", self.table_name, query, job_config)
 
     async def ingest_startup_data(self, startup: StartupCreate) -> Dict[str, Any]:
         """
@@ -804,10 +867,7 @@ Return only this JSON format:
                 ]
             )
 
-            query_job = self.client.query(query, job_config=job_config)
-            results = query_job.result()
-
-            existing = [dict(row.items()) for row in results]
+            existing = await self._run_query("find_startup_by_name", query, job_config)
             if existing:
                 logger.info(f"Startup '{startup.name}' already exists with id {existing[0].get('id')}")
                 return {
@@ -816,8 +876,7 @@ Return only this JSON format:
                 }
 
             # Prepare insert if not exists
-            table_ref = self.client.dataset(self.dataset_name).table(self.table_name)
-            table = self.client.get_table(table_ref)
+            table = self._tables.get(self.table_name) or await self._run("get_table", self._get_table, self.table_name)
             
             rows_to_insert = [{
                 'name': startup.name,
@@ -827,7 +886,8 @@ Return only this JSON format:
                 'updated_at': datetime.utcnow().isoformat()
             }]
             
-            errors = self.client.insert_rows_json(table, rows_to_insert)
+            errors = await self._run("insert_startup", self.client.insert_rows_json, table, rows_to_insert)
+            self._invalidate_cached_reads(self.table_name)
             
             if errors:
                 raise Exception(f"Errors occurred while ingesting data: {errors}")
@@ -839,17 +899,15 @@ Return only this JSON format:
             logger.error(f"Error in ingest_startup_data: {str(e)}")
             raise
 
-    async def fetch_document_analysis(
+    def _document_analysis_query(
         self,
-        company_name: Optional[str] = None,
-        industry: Optional[str] = None,
-        founding_year_min: Optional[int] = None,
-        founding_year_max: Optional[int] = None,
-        company_stage: Optional[str] = None,
-        limit: int = 100
-    ) -> List[Dict[str, Any]]:
-        """Fetch document analysis records with optional filters"""
-
+        company_name: Optional[str],
+        industry: Optional[str],
+        founding_year_min: Optional[int],
+        founding_year_max: Optional[int],
+        company_stage: Optional[str],
+        limit: int
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
         # Validate year range
         if founding_year_min is not None and founding_year_max is not None:
             if founding_year_max < founding_year_min:
@@ -895,11 +953,37 @@ Return only this JSON format:
         job_config = bigquery.QueryJobConfig(query_parameters=params)
 
         logger.info(f"Running query on document_analysis with filters: {filters}")
+        return query, job_config
 
-        loop = asyncio.get_event_loop()
-        query_job = await loop.run_in_executor(None, lambda: self.client.query(query, job_config=job_config).result())
-        rows = [dict(row.items()) for row in query_job]
-        return rows
+    async def fetch_document_analysis(
+        self,
+        company_name: Optional[str] = None,
+        industry: Optional[str] = None,
+        founding_year_min: Optional[int] = None,
+        founding_year_max: Optional[int] = None,
+        company_stage: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Fetch document analysis records with optional filters"""
+        query, job_config = self._document_analysis_query(
+            company_name, industry, founding_year_min, founding_year_max, company_stage, limit
+        )
+        return await self._cached_query("fetch_document_analysis", self.doc_analysis_table, query, job_config)
+
+    async def fetch_document_analysis_arrow(
+        self,
+        company_name: Optional[str] = None,
+        industry: Optional[str] = None,
+        founding_year_min: Optional[int] = None,
+        founding_year_max: Optional[int] = None,
+        company_stage: Optional[str] = None,
+        limit: int = 100
+    ) -> pa.Table:
+        """Same rows as fetch_document_analysis as an Arrow table (uncached)"""
+        query, job_config = self._document_analysis_query(
+            company_name, industry, founding_year_min, founding_year_max, company_stage, limit
+        )
+        return await self._run_arrow_query("fetch_document_analysis_arrow", query, job_config)
     
     async def update_pitch_deck_url(self, startup_id: int, pitch_deck_url: str) -> bool:
         """Update the pitch_deck_url for a specific startup"""
@@ -917,8 +1001,8 @@ Return only this JSON format:
                 ]
             )
             
-            query_job = self.client.query(query, job_config=job_config)
-            query_job.result()  # Wait for completion
+            await self._run_query("update_pitch_deck_url", query, job_config)
+            self._invalidate_cached_reads(self.table_name)
             
             logger.info(f"Updated pitch_deck_url for startup {startup_id}")
             return True
@@ -937,8 +1021,7 @@ Return only this JSON format:
             WHERE pitch_deck_url IS NULL
             """
             
-            query_job = self.client.query(query)
-            results = query_job.result()
+            results = await self._run_query("find_null_pitch_deck_urls", query)
             
             updated_count = 0
             failed_count = 0
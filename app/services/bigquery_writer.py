@@ -0,0 +1,154 @@
+"""
+Micro-batched streaming inserts into a BigQuery table.
+
+Callers submit one row at a time and get a Future. A background thread takes
+rows from a bounded queue and sends them with one insert_rows_json call per
+batch, flushing when the batch is full or FLUSH_SECONDS after its first row.
+Each row carries an insert ID, so a batch retried after a transient error
+(5xx, throttling, a dropped connection) is de-duplicated by BigQuery; any other
+error fails the batch's Futures at once. Invalid rows are skipped and reported on their own
+Future without failing the rest of the batch. close() drains the queue.
+"""
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Tuple
+
+import requests
+from google.api_core import exceptions as google_exceptions
+from google.cloud import bigquery
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# How long submit() waits for room in a full queue before raising queue.Full
+ENQUEUE_TIMEOUT_SECONDS = 5.0
+
+# Errors worth retrying: server-side failures (ServerError covers ServiceUnavailable),
+# throttling and transport failures. Anything else, e.g. a missing table or a denied
+# permission, fails the same way on every attempt.
+_TRANSIENT_ERRORS = (
+    google_exceptions.ServerError,
+    google_exceptions.TooManyRequests,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    ConnectionError,
+    TimeoutError,
+)
+
+_Pending = Tuple[Dict[str, Any], str, "Future[List[Dict[str, Any]]]"]
+
+
+class BigQueryBatchWriter:
+    def __init__(self, client: bigquery.Client, table_id: str, name: str):
+        self.client = client
+        self.table_id = table_id
+        self.name = name
+        self.batch_size = settings.BIGQUERY_WRITE_BATCH_SIZE
+        self.flush_seconds = settings.BIGQUERY_WRITE_FLUSH_SECONDS
+        self._queue: "queue.Queue[_Pending]" = queue.Queue(maxsize=settings.BIGQUERY_WRITE_QUEUE_SIZE)
+        self._closed = threading.Event()
+        self._batches = 0
+        self._rows = 0
+        self._failed_rows = 0
+        self._thread = threading.Thread(target=self._run, name=f"bigquery-writer-{name}", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self._batches,
+            "rows": self._rows,
+            "failed_rows": self._failed_rows,
+        }
+
+    def submit(self, row: Dict[str, Any], row_id: str) -> "Future[List[Dict[str, Any]]]":
+        """
+        Queue `row` (JSON-serializable) for insertion. The Future resolves to the row's
+        insert errors ([] on success) once its batch is sent, or raises if every retry
+        failed. Blocks up to ENQUEUE_TIMEOUT_SECONDS when the queue is full.
+        """
+        if self._closed.is_set():
+            raise RuntimeError(f"BigQuery writer {self.name} is closed")
+        future: "Future[List[Dict[str, Any]]]" = Future()
+        self._queue.put((row, row_id, future), timeout=ENQUEUE_TIMEOUT_SECONDS)
+        return future
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Stop accepting rows and wait for queued ones to be written."""
+        self._closed.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("BigQuery writer %s did not drain within %.0fs (%d rows queued)",
+                           self.name, timeout, self._queue.qsize())
+
+    # --- Background thread ---
+
+    def _run(self) -> None:
+        while not (self._closed.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+
+    def _next_batch(self) -> List[_Pending]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_seconds)]
+        except queue.Empty:
+            return []
+        flush_at = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            try:
+                if self._closed.is_set():
+                    # Draining: send what is queued without waiting for more
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=max(flush_at - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: List[_Pending]) -> None:
+        rows = [row for row, _, _ in batch]
+        row_ids = [row_id for _, row_id, _ in batch]
+        attempts = settings.BIGQUERY_WRITE_MAX_RETRIES + 1
+
+        for attempt in range(1, attempts + 1):
+            started = time.perf_counter()
+            try:
+                errors = self.client.insert_rows_json(
+                    self.table_id, rows, row_ids=row_ids, skip_invalid_rows=True
+                )
+                break
+            except Exception as e:
+                if attempt == attempts or not isinstance(e, _TRANSIENT_ERRORS):
+                    logger.error("BigQuery writer %s dropped %d rows after %d attempt(s): %s",
+                                 self.name, len(batch), attempt, e)
+                    metrics.incr("bigquery.write_rows", len(batch), table=self.name, outcome="error")
+                    self._failed_rows += len(batch)
+                    for _, _, future in batch:
+                        future.set_exception(e)
+                    return
+                # Same insert IDs on retry, so rows that did land are not duplicated
+                delay = settings.BIGQUERY_WRITE_BACKOFF_SECONDS * (2 ** (attempt - 1)) * random.uniform(0.75, 1.25)
+                logger.warning("BigQuery writer %s insert failed (%s), retry %d/%d in %.1fs",
+                               self.name, e, attempt, attempts - 1, delay)
+                time.sleep(delay)
+            finally:
+                metrics.observe("bigquery.write_latency", (time.perf_counter() - started) * 1000, table=self.name)
+
+        row_errors = {error["index"]: error["errors"] for error in errors}
+        for index, (_, _, future) in enumerate(batch):
+            future.set_result(row_errors.get(index, []))
+
+        self._batches += 1
+        self._rows += len(batch) - len(row_errors)
+        self._failed_rows += len(row_errors)
+        metrics.incr("bigquery.write_batches", table=self.name)
+        metrics.incr("bigquery.write_rows", len(batch) - len(row_errors), table=self.name, outcome="ok")
+        if row_errors:
+            metrics.incr("bigquery.write_rows", len(row_errors), table=self.name, outcome="invalid")
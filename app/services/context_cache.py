@@ -0,0 +1,162 @@
+"""
+Gemini context caching for static system instructions.
+
+A prompt's fixed preamble (instructions, output format) is uploaded once as a
+cachedContent resource and referenced by name on later calls, so it is not
+re-sent or re-processed per request. Caches are created lazily on first use,
+their TTL is extended shortly before expiry, and any failure (model without
+caching support, instruction below the minimum cacheable size, API error)
+marks that instruction as uncacheable for a while so callers fall back to
+sending it inline.
+"""
+import asyncio
+import datetime
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Cached content must name an explicit model version
+CACHEABLE_MODEL_VERSIONS: Dict[str, str] = {
+    "gemini-1.5-flash": "gemini-1.5-flash-002",
+    "gemini-1.5-pro": "gemini-1.5-pro-002",
+    "gemini-2.0-flash-exp": "gemini-2.0-flash-exp",
+}
+
+# Smallest cache the API accepts per model, in tokens; shorter instructions are sent inline
+MIN_CACHE_TOKENS: Dict[str, int] = {
+    "gemini-1.5-flash": 32768,
+    "gemini-1.5-pro": 32768,
+    "gemini-2.0-flash-exp": 4096,
+}
+
+# After a failed create, send the instruction inline for this long before trying again
+UNSUPPORTED_RETRY_SECONDS = 60 * 60
+
+
+@dataclass
+class CachedContext:
+    name: str
+    model_version: str
+    expires_at: float
+    handle: Any = None  # Vertex CachedContent object; None for the Gemini API
+
+
+class ContextCacheManager:
+    def __init__(self, http_client: Callable[[], httpx.AsyncClient]):
+        self._http_client = http_client
+        self._entries: Dict[Tuple[str, str, str], CachedContext] = {}
+        self._unsupported_until: Dict[Tuple[str, str, str], float] = {}
+        self._locks: Dict[Tuple[str, str, str], asyncio.Lock] = {}
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "active": sum(1 for entry in self._entries.values() if entry.expires_at > now),
+            "unsupported": sum(1 for until in self._unsupported_until.values() if until > now),
+        }
+
+    async def get(self, backend: str, model: str, system_instruction: str) -> Optional[CachedContext]:
+        """Cache handle for (backend, model, instruction), or None to send the instruction inline."""
+        if not settings.CONTEXT_CACHE_ENABLED or model not in CACHEABLE_MODEL_VERSIONS:
+            return None
+        # Rough 4 chars/token estimate; the API rejects caches below its minimum size
+        if len(system_instruction) // 4 < MIN_CACHE_TOKENS[model]:
+            metrics.incr("llm.context_cache", model=model, outcome="inline")
+            return None
+
+        key = (backend, model, hashlib.sha256(system_instruction.encode("utf-8")).hexdigest())
+        if self._unsupported_until.get(key, 0) > time.time():
+            return None
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at - time.time() > settings.CONTEXT_CACHE_REFRESH_MARGIN_SECONDS:
+            metrics.incr("llm.context_cache", model=model, outcome="hit")
+            return entry
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            now = time.time()
+            try:
+                if entry is not None and entry.expires_at - now > settings.CONTEXT_CACHE_REFRESH_MARGIN_SECONDS:
+                    outcome = "hit"
+                elif entry is not None and entry.expires_at > now:
+                    await self._refresh(backend, entry)
+                    outcome = "refreshed"
+                else:
+                    entry = await self._create(backend, model, system_instruction)
+                    self._entries[key] = entry
+                    outcome = "created"
+            except Exception as e:
+                logger.warning("Context cache unavailable for %s, sending instruction inline: %s", model, e)
+                self._entries.pop(key, None)
+                self._unsupported_until[key] = time.time() + UNSUPPORTED_RETRY_SECONDS
+                metrics.incr("llm.context_cache", model=model, outcome="unsupported")
+                return None
+
+        metrics.incr("llm.context_cache", model=model, outcome=outcome)
+        return entry
+
+    def invalidate(self, cached: CachedContext) -> None:
+        """Forget a cache the API no longer recognizes (e.g. deleted or expired early)."""
+        for key, entry in list(self._entries.items()):
+            if entry is cached:
+                del self._entries[key]
+
+    # --- Gemini API / Vertex AI resources ---
+
+    async def _create(self, backend: str, model: str, system_instruction: str) -> CachedContext:
+        model_version = CACHEABLE_MODEL_VERSIONS[model]
+        ttl = settings.CONTEXT_CACHE_TTL_SECONDS
+
+        if backend == "vertex":
+            from vertexai.preview import caching
+
+            handle = await asyncio.to_thread(
+                caching.CachedContent.create,
+                model_name=model_version,
+                system_instruction=system_instruction,
+                ttl=datetime.timedelta(seconds=ttl),
+            )
+            logger.info("Created Vertex context cache %s for %s", handle.name, model_version)
+            return CachedContext(handle.name, model_version, time.time() + ttl, handle)
+
+        response = await self._http_client().post(
+            "/cachedContents",
+            headers={"x-goog-api-key": settings.SCOPIFY_GOOGLE_AI_API_KEY or ""},
+            json={
+                "model": f"models/{model_version}",
+                "systemInstruction": {"parts": [{"text": system_instruction}]},
+                "ttl": f"{ttl}s",
+            },
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"cachedContents create failed: {response.status_code} - {response.text}")
+        name = response.json()["name"]
+        logger.info("Created context cache %s for %s", name, model_version)
+        return CachedContext(name, model_version, time.time() + ttl)
+
+    async def _refresh(self, backend: str, entry: CachedContext) -> None:
+        ttl = settings.CONTEXT_CACHE_TTL_SECONDS
+        if backend == "vertex":
+            await asyncio.to_thread(entry.handle.update, ttl=datetime.timedelta(seconds=ttl))
+        else:
+            response = await self._http_client().patch(
+                f"/{entry.name}",
+                params={"updateMask": "ttl"},
+                headers={"x-goog-api-key": settings.SCOPIFY_GOOGLE_AI_API_KEY or ""},
+                json={"ttl": f"{ttl}s"},
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"cachedContents update failed: {response.status_code} - {response.text}")
+        entry.expires_at = time.time() + ttl
+        logger.info("Extended context cache %s", entry.name)
@@ -0,0 +1,180 @@
+"""
+Token-budgeted context packing for pitchdeck prompts.
+
+Splits the structured document into slide / page / text segments, drops text
+that duplicates slide content, scores each segment by information density (figures,
+financial terms, team/market sections) and keeps the best segments that fit the
+token budget, emitted back in document order. Documents too large for one
+prompt are instead cut into consecutive chunks for map-reduce summarization.
+"""
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Gemini averages roughly four characters per token on English prose
+CHARS_PER_TOKEN = 4
+# Target size for segments cut from free text (DocAI output has no slides)
+TEXT_SEGMENT_CHARS = 1200
+
+_NUMBER_RE = re.compile(r"[$€£₹]?\d[\d,.]*\s?(?:%|x\b|k\b|m\b|bn?\b|mn\b|million|billion|crore|lakh)?", re.IGNORECASE)
+_FINANCIAL_RE = re.compile(
+    r"\b(revenue|arr|mrr|gmv|ebitda|margin|burn|runway|valuation|raise|raising|round|funding|"
+    r"cac|ltv|churn|retention|growth|profit|unit economics|pricing|customers|users|pipeline|traction)\b",
+    re.IGNORECASE,
+)
+_SECTION_RE = re.compile(
+    r"\b(founder|co-founder|ceo|cto|coo|team|advisor|experience|market|tam|sam|som|"
+    r"competitor|competition|landscape|moat|go-to-market|gtm|ask|use of funds)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class ContextSegment:
+    label: str
+    text: str
+    order: int
+    score: float = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _normalize_line(line: str) -> str:
+    return " ".join(line.split()).casefold()
+
+
+def _score(segment: ContextSegment) -> float:
+    text = segment.text
+    signal = (
+        2.0 * len(_NUMBER_RE.findall(text))
+        + 3.0 * len(_FINANCIAL_RE.findall(text))
+        + 2.0 * len(_SECTION_RE.findall(text))
+    )
+    # Density per token, floored so one-word slides don't dominate
+    density = signal / max(segment.tokens, 25)
+    # The title slide / opening text carries the company name and one-liner
+    if segment.order == 0:
+        density += 1.0
+    return density
+
+
+def build_segments(structured: Dict[str, Any]) -> List[ContextSegment]:
+    segments: List[ContextSegment] = []
+    seen_lines = set()
+
+    for slide in structured.get("slides") or []:
+        lines = []
+        for block in slide.get("texts") or []:
+            for line in str(block).splitlines():
+                key = _normalize_line(line)
+                if key and key not in seen_lines:
+                    seen_lines.add(key)
+                    lines.append(line.strip())
+        if lines:
+            segments.append(ContextSegment(f"Slide {slide.get('slide')}", "\n".join(lines), len(segments)))
+
+    for page in structured.get("pages") or []:
+        lines = []
+        for line in (page.get("text") or "").splitlines():
+            key = _normalize_line(line)
+            if key and key not in seen_lines:
+                seen_lines.add(key)
+                lines.append(line.strip())
+        if lines:
+            segments.append(ContextSegment(f"Page {page.get('page')}", "\n".join(lines), len(segments)))
+
+    # Free text not already covered by a slide or page, cut into paragraph-sized segments
+    buffer: List[str] = []
+    buffer_chars = 0
+    for line in (structured.get("text") or "").splitlines():
+        key = _normalize_line(line)
+        if not key or key in seen_lines:
+            continue
+        seen_lines.add(key)
+        buffer.append(line.strip())
+        buffer_chars += len(line)
+        if buffer_chars >= TEXT_SEGMENT_CHARS:
+            segments.append(ContextSegment("Text", "\n".join(buffer), len(segments)))
+            buffer, buffer_chars = [], 0
+    if buffer:
+        segments.append(ContextSegment("Text", "\n".join(buffer), len(segments)))
+
+    return segments
+
+
+def pack_context(structured: Dict[str, Any], token_budget: int) -> str:
+    """
+    Return the highest-value, de-duplicated content of `structured` that fits in
+    token_budget, in original document order.
+    """
+    segments = build_segments(structured)
+    for segment in segments:
+        segment.score = _score(segment)
+
+    selected: List[ContextSegment] = []
+    used = 0
+    for segment in sorted(segments, key=lambda s: s.score, reverse=True):
+        header_tokens = estimate_tokens(segment.label) + 1
+        cost = segment.tokens + header_tokens
+        if used + cost <= token_budget:
+            selected.append(segment)
+            used += cost
+        elif not selected and token_budget > header_tokens:
+            # A single oversized top segment: keep its beginning rather than nothing
+            keep_chars = (token_budget - header_tokens) * CHARS_PER_TOKEN
+            selected.append(ContextSegment(segment.label, segment.text[:keep_chars], segment.order, segment.score))
+            used = token_budget
+
+    selected.sort(key=lambda s: s.order)
+    logger.info(
+        "Packed %d/%d segments into ~%d tokens (budget %d)",
+        len(selected), len(segments), used, token_budget,
+    )
+    return render_segments(selected)
+
+
+def chunk_segments(segments: List[ContextSegment], chunk_tokens: int) -> List[List[ContextSegment]]:
+    """
+    Group consecutive segments into chunks of at most ~chunk_tokens, splitting any
+    single segment that is larger than a chunk on line boundaries.
+    """
+    max_chars = chunk_tokens * CHARS_PER_TOKEN
+    chunks: List[List[ContextSegment]] = []
+    current: List[ContextSegment] = []
+    used = 0
+
+    for segment in segments:
+        pieces = [segment]
+        if segment.tokens > chunk_tokens:
+            pieces, buffer = [], ""
+            for line in segment.text.splitlines():
+                if buffer and len(buffer) + len(line) + 1 > max_chars:
+                    pieces.append(ContextSegment(segment.label, buffer, segment.order))
+                    buffer = ""
+                buffer = f"{buffer}\n{line}" if buffer else line[:max_chars]
+            if buffer:
+                pieces.append(ContextSegment(segment.label, buffer, segment.order))
+
+        for piece in pieces:
+            if current and used + piece.tokens > chunk_tokens:
+                chunks.append(current)
+                current, used = [], 0
+            current.append(piece)
+            used += piece.tokens
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def render_segments(segments: List[ContextSegment]) -> str:
+    return "\n\n".join(f"{segment.label}:\n{segment.text}" for segment in segments)
@@ -1,6 +1,7 @@
 
 ## `app/services/doc_processor_service.py`
 
+import asyncio
 import os
 import mimetypes
 import logging
@@ -31,6 +32,7 @@ async def process_file_to_structured(file_path: str) -> Dict[str, Any]:
       "text": str,
       "tables": list,
       "slides": list,
+      "pages": list,
       "entities": list,
       "metadata": dict
     }
@@ -48,9 +50,10 @@ async def process_file_to_structured(file_path: str) -> Dict[str, Any]:
         logger.info("Processing as PPTX file")
         return _extract_pptx(file_path)
 
-    # Fallback to Document AI for PDFs and other docs
+    # Fallback to Document AI for PDFs and other docs; the blocking client runs in a
+    # worker thread so the event loop (and client-disconnect checks) keep running
     logger.info("Processing with Document AI")
-    return _extract_docai(file_path)
+    return await asyncio.to_thread(_extract_docai, file_path)
 
 
 def _extract_pptx(file_path: str) -> Dict[str, Any]:
@@ -78,6 +81,7 @@ def _extract_pptx(file_path: str) -> Dict[str, Any]:
             "text": "\n".join(all_texts),
             "tables": [],
             "slides": slides_data,
+            "pages": [],
             "entities": [],
             "metadata": {"slides": len(slides_data)}
         }
@@ -117,13 +121,23 @@ def _extract_docai(file_path: str) -> Dict[str, Any]:
         result = client.process_document(request=request)
         document = result.document
         logger.info("Document processing completed")
-        return document
     except Exception as e:
         logger.error(f"Error in Document AI processing: {str(e)}", exc_info=True)
         raise
 
     text = document.text or ""
 
+    # Per-page text so large documents can be chunked page by page
+    pages = []
+    for i, page in enumerate(document.pages, start=1):
+        page_text = ""
+        if page.layout and page.layout.text_anchor:
+            for segment in page.layout.text_anchor.text_segments:
+                start = int(segment.start_index) if segment.start_index else 0
+                end = int(segment.end_index) if segment.end_index else None
+                page_text += text[start:end]
+        pages.append({"page": i, "text": page_text})
+
     tables = []
     for page in document.pages:
         for table in page.tables:
@@ -156,6 +170,7 @@ def _extract_docai(file_path: str) -> Dict[str, Any]:
         "text": text,
         "tables": tables,
         "slides": [],
+        "pages": pages,
         "entities": entities,
         "metadata": {"pages": len(document.pages) if document.pages else 0}
     }
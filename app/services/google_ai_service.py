@@ -1,23 +1,41 @@
 import httpx
-import json
 from typing import Dict, Any, Optional
 from fastapi import HTTPException, status
 
 from app.core.config import settings
+from app.core.deadline import DeadlineExceeded
+from app.schemas.ai_output import CompanyProfileOutput
+from app.services.context_packer import estimate_tokens
+from app.services.llm_gateway import LLMGatewayError, llm_gateway
+from app.services.model_router import route_model
+from app.utils.single_flight import SingleFlight
+from app.utils.gemini_schema import to_response_schema
+from app.utils.json_extract import extract_json
+from app.utils.text import normalize_key
+
+COMPANY_PROFILE_SCHEMA = to_response_schema(CompanyProfileOutput)
 
 
 class GoogleAIService:
     def __init__(self):
         self.api_key = settings.SCOPIFY_GOOGLE_AI_API_KEY
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta"
         
         if not self.api_key:
             raise ValueError("Google AI API key is not configured")
 
+        self._search_flights = SingleFlight("company_search")
+
     async def search_company_information(self, company_name: str, custom_query: Optional[str] = None) -> Dict[str, Any]:
         """
         Search for company information using Google AI Studio.
+        Concurrent searches for the same company and query share one upstream call.
         """
+        key = (normalize_key(company_name), normalize_key(custom_query))
+        return await self._search_flights.do(
+            key, lambda: self._search_company_information(company_name, custom_query)
+        )
+
+    async def _search_company_information(self, company_name: str, custom_query: Optional[str] = None) -> Dict[str, Any]:
         try:
             # Create a comprehensive search prompt
             search_query = custom_query or f"""
@@ -39,71 +57,52 @@ class GoogleAIService:
             """
             
             # Prepare the request payload for Google AI Studio
-            payload = {
-                "contents": [
-                    {
-                        "parts": [
-                            {
-                                "text": search_query.strip()
-                            }
-                        ]
-                    }
-                ],
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "topK": 40,
-                    "topP": 0.95,
-                    "maxOutputTokens": 2048,
-                }
+            generation_config = {
+                "temperature": 0.7,
+                "topK": 40,
+                "topP": 0.95,
+                "maxOutputTokens": 2048,
             }
-            
-            # Make the API request
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/models/gemini-1.5-flash:generateContent?key={self.api_key}",
-                    headers={
-                        "Content-Type": "application/json",
-                    },
-                    json=payload
-                )
-                
-                if response.status_code != 200:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=f"Google AI API error: {response.status_code} - {response.text}"
-                    )
-                
-                result = response.json()
-                
-                # Extract the generated content
-                if "candidates" not in result or not result["candidates"]:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail="No response generated from Google AI"
-                    )
-                
-                generated_text = result["candidates"][0]["content"]["parts"][0]["text"]
-                
-                # Try to parse as JSON, if it fails, return as structured text
-                try:
-                    parsed_info = json.loads(generated_text)
-                except json.JSONDecodeError:
-                    # If not valid JSON, structure it as a text response
-                    parsed_info = {
-                        "raw_response": generated_text,
-                        "company_name": company_name,
-                        "search_timestamp": None,  # Will be set by the calling function
-                        "format": "text"
-                    }
-                
-                return {
+            if not custom_query:
+                # Constrain output to the company profile shape so it always parses;
+                # a custom question gets a free-form answer
+                generation_config["responseMimeType"] = "application/json"
+                generation_config["responseSchema"] = COMPANY_PROFILE_SCHEMA
+            route = route_model("company_search", estimate_tokens(search_query.strip()))
+
+            # Not served from the response cache: the route only calls this once its stored
+            # result is older than its freshness window, and wants a new answer
+            generated_text = await llm_gateway.generate(
+                route.model, search_query.strip(), generation_config, cache=False
+            )
+
+            # Try to parse as JSON, if it fails, return as structured text
+            parsed_info = extract_json(generated_text)
+            if parsed_info is None:
+                # If not valid JSON, structure it as a text response
+                parsed_info = {
+                    "raw_response": generated_text,
                     "company_name": company_name,
-                    "information": parsed_info,
-                    "search_query": search_query,
-                    "ai_model": "gemini-1.5-flash",
-                    "status": "success"
+                    "search_timestamp": None,  # Will be set by the calling function
+                    "format": "text"
                 }
-                
+            
+            return {
+                "company_name": company_name,
+                "information": parsed_info,
+                "search_query": search_query,
+                "ai_model": route.model,
+                "status": "success"
+            }
+            
+        except DeadlineExceeded:
+            # The app's handler turns this into a 504
+            raise
+        except LLMGatewayError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=e.message
+            )
         except httpx.TimeoutException:
             raise HTTPException(
                 status_code=status.HTTP_408_REQUEST_TIMEOUT,
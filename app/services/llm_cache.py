@@ -0,0 +1,71 @@
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import orjson
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.utils.cache import CacheBackend, MemoryLRUBackend, SQLiteBackend, TieredCache
+
+logger = logging.getLogger(__name__)
+
+
+def make_llm_cache_key(model: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Content address for a generation request: model, whitespace-normalized prompt
+    hash and the canonical (sorted-key) generation config.
+    """
+    prompt_hash = hashlib.sha256(" ".join(prompt.split()).encode("utf-8")).hexdigest()
+    config = orjson.dumps(generation_config or {}, option=orjson.OPT_SORT_KEYS, default=str)
+    return hashlib.sha256(model.encode("utf-8") + b"\0" + prompt_hash.encode("ascii") + b"\0" + config).hexdigest()
+
+
+def _build_llm_response_cache() -> TieredCache:
+    backends: list[CacheBackend] = [MemoryLRUBackend(max_entries=settings.LLM_CACHE_MEMORY_MAX_ENTRIES)]
+    if settings.LLM_CACHE_SQLITE_PATH:
+        try:
+            backends.append(
+                SQLiteBackend(settings.LLM_CACHE_SQLITE_PATH, max_entries=settings.LLM_CACHE_DISK_MAX_ENTRIES)
+            )
+        except Exception as e:
+            logger.warning("LLM disk cache unavailable at %s, using memory only: %s", settings.LLM_CACHE_SQLITE_PATH, e)
+    return TieredCache("llm_response", backends, ttl=settings.LLM_CACHE_TTL_SECONDS)
+
+
+llm_response_cache = _build_llm_response_cache()
+metrics.register_gauge("llm_cache", llm_response_cache.stats)
+
+
+async def cached_generate(
+    model: str,
+    prompt: str,
+    generation_config: Optional[Dict[str, Any]],
+    generate: Callable[[], Awaitable[str]],
+    is_cacheable: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """
+    Return the cached response text for (model, prompt, generation_config), or call
+    `generate` and cache its text. `is_cacheable` can reject responses (e.g. ones
+    that failed to parse) so they are retried next time instead of replayed.
+    """
+    if not settings.LLM_CACHE_ENABLED:
+        return await generate()
+
+    key = make_llm_cache_key(model, prompt, generation_config)
+    try:
+        cached = await llm_response_cache.aget(key)
+    except Exception as e:
+        logger.warning("LLM cache lookup failed: %s", e)
+        cached = None
+    if cached is not None:
+        logger.info("LLM cache hit: model=%s key=%s", model, key[:12])
+        return cached
+
+    text = await generate()
+    if text and (is_cacheable is None or is_cacheable(text)):
+        try:
+            await llm_response_cache.aset(key, text)
+        except Exception as e:
+            logger.warning("LLM cache write failed: %s", e)
+    return text
@@ -0,0 +1,492 @@
+"""
+Single entry point for Gemini calls.
+
+Owns one pooled HTTP/2 client for the Generative Language API and Vertex AI
+model handles created once per model. Applies per-model timeouts, concurrency
+limits and retries, consults the response cache, and records call, latency and
+token metrics. Services pass their model name, prompt and generation config
+(camelCase for the "genai" backend, snake_case for "vertex").
+
+Static preambles can be passed as `system_instruction`; they are served from a
+Gemini context cache when the model and instruction size allow it, and sent
+inline otherwise. Non-streaming calls that run past their p95 latency may be
+hedged with one backup request (see llm_hedging).
+"""
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+import orjson
+
+from app.core import deadline
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.context_cache import CachedContext, ContextCacheManager
+from app.services.llm_hedging import HedgePolicy
+from app.services.llm_cache import cached_generate, llm_response_cache, make_llm_cache_key
+
+logger = logging.getLogger(__name__)
+
+GENAI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Status codes returned for a context cache that was deleted or expired server-side
+STALE_CACHE_STATUS_CODES = {400, 403, 404}
+
+
+@dataclass(frozen=True)
+class ModelPolicy:
+    timeout: float
+    max_concurrency: int
+
+
+# Per-model call budgets; anything not listed gets DEFAULT_POLICY
+MODEL_POLICIES: Dict[str, ModelPolicy] = {
+    "gemini-1.5-flash": ModelPolicy(timeout=30.0, max_concurrency=16),
+    "gemini-1.5-pro": ModelPolicy(timeout=60.0, max_concurrency=4),
+    "gemini-2.0-flash-exp": ModelPolicy(timeout=45.0, max_concurrency=8),
+}
+DEFAULT_POLICY = ModelPolicy(timeout=60.0, max_concurrency=4)
+
+
+class LLMGatewayError(Exception):
+    """Non-retryable (or retries exhausted) error response from the model API."""
+
+    def __init__(self, status_code: Optional[int], message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def _cache_prompt(prompt: str, system_instruction: Optional[str]) -> str:
+    """Response-cache key text: the instruction is part of what determines the output."""
+    return f"{system_instruction}\n\n{prompt}" if system_instruction else prompt
+
+
+class LLMGateway:
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._vertex_models: Dict[str, Any] = {}
+        self._vertex_lock = threading.Lock()
+        self._vertex_initialized = False
+        self.context_cache = ContextCacheManager(self._http_client)
+        metrics.register_gauge("llm_context_cache", self.context_cache.stats)
+        self.hedging = HedgePolicy()
+        metrics.register_gauge("llm_hedging", self.hedging.stats)
+
+    # --- Connection / model handles ---
+
+    def _http_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            http2 = importlib.util.find_spec("h2") is not None
+            if not http2:
+                logger.warning("h2 is not installed; LLM gateway falling back to HTTP/1.1")
+            self._client = httpx.AsyncClient(
+                base_url=GENAI_BASE_URL,
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                    keepalive_expiry=60.0,
+                ),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._client
+
+    def _vertex_model(
+        self, model: str, system_instruction: Optional[str] = None, cached: Optional[CachedContext] = None
+    ) -> Any:
+        if cached is not None:
+            key = cached.name
+        elif system_instruction:
+            key = f"{model}:{hashlib.sha256(system_instruction.encode('utf-8')).hexdigest()}"
+        else:
+            key = model
+        handle = self._vertex_models.get(key)
+        if handle is not None:
+            return handle
+        with self._vertex_lock:
+            if not self._vertex_initialized:
+                import vertexai
+
+                vertexai.init(project=settings.DOCAI_PROJECT_ID, location=settings.VERTEX_LOCATION)
+                self._vertex_initialized = True
+            if key not in self._vertex_models:
+                from vertexai.generative_models import GenerativeModel
+
+                if cached is not None:
+                    self._vertex_models[key] = GenerativeModel.from_cached_content(cached_content=cached.handle)
+                else:
+                    self._vertex_models[key] = GenerativeModel(model, system_instruction=system_instruction)
+            return self._vertex_models[key]
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(model)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(MODEL_POLICIES.get(model, DEFAULT_POLICY).max_concurrency)
+            self._semaphores[model] = semaphore
+        return semaphore
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # --- Calls ---
+
+    @staticmethod
+    def _genai_body(
+        prompt: str, generation_config: Dict[str, Any], system_instruction: Optional[str]
+    ) -> Dict[str, Any]:
+        body: Dict[str, Any] = {"contents": [{"parts": [{"text": prompt}]}], "generationConfig": generation_config}
+        if system_instruction:
+            body["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+        return body
+
+    async def _genai_request(
+        self, model: str, prompt: str, generation_config: Dict[str, Any], system_instruction: Optional[str]
+    ) -> Tuple[str, Dict[str, Any], Optional[CachedContext]]:
+        """(model to call, request body, context cache used) for a Gemini API call."""
+        cached = None
+        if system_instruction:
+            cached = await self.context_cache.get("genai", model, system_instruction)
+        if cached is None:
+            return model, self._genai_body(prompt, generation_config, system_instruction), None
+        body = self._genai_body(prompt, generation_config, None)
+        body["cachedContent"] = cached.name
+        return cached.model_version, body, cached
+
+    async def _call_genai(
+        self,
+        model: str,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        timeout: float,
+        system_instruction: Optional[str] = None,
+    ) -> str:
+        api_key = settings.SCOPIFY_GOOGLE_AI_API_KEY
+        if not api_key:
+            raise LLMGatewayError(None, "Google AI API key is not configured")
+
+        target, body, cached = await self._genai_request(model, prompt, generation_config, system_instruction)
+        response = await self._http_client().post(
+            f"/models/{target}:generateContent",
+            # Key in a header rather than the query string, so it stays out of URL logs
+            headers={"x-goog-api-key": api_key},
+            json=body,
+            timeout=timeout,
+        )
+        if cached is not None and response.status_code in STALE_CACHE_STATUS_CODES:
+            # The cache went away server-side; send the instruction inline this time
+            self.context_cache.invalidate(cached)
+            response = await self._http_client().post(
+                f"/models/{model}:generateContent",
+                headers={"x-goog-api-key": api_key},
+                json=self._genai_body(prompt, generation_config, system_instruction),
+                timeout=timeout,
+            )
+        if response.status_code != 200:
+            raise LLMGatewayError(response.status_code, f"Google AI API error: {response.status_code} - {response.text}")
+
+        result = response.json()
+        self._record_usage(model, result.get("usageMetadata") or {})
+        if "candidates" not in result or not result["candidates"]:
+            raise LLMGatewayError(200, "No response generated from Google AI")
+        return result["candidates"][0]["content"]["parts"][0]["text"]
+
+    async def _call_vertex(
+        self,
+        model: str,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        timeout: float,
+        system_instruction: Optional[str] = None,
+    ) -> str:
+        cached = None
+        if system_instruction:
+            cached = await self.context_cache.get("vertex", model, system_instruction)
+        handle = self._vertex_model(model, system_instruction, cached)
+        try:
+            response = await asyncio.wait_for(
+                handle.generate_content_async(prompt, generation_config=generation_config),
+                timeout=timeout,
+            )
+        except Exception as e:
+            if cached is None or "cached" not in str(e).lower():
+                raise
+            # The cache went away server-side; send the instruction inline this time
+            self.context_cache.invalidate(cached)
+            response = await asyncio.wait_for(
+                self._vertex_model(model, system_instruction).generate_content_async(
+                    prompt, generation_config=generation_config
+                ),
+                timeout=timeout,
+            )
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self._record_usage(model, {
+                "promptTokenCount": getattr(usage, "prompt_token_count", 0),
+                "candidatesTokenCount": getattr(usage, "candidates_token_count", 0),
+            })
+        if not response or not hasattr(response, "text"):
+            raise LLMGatewayError(None, "Empty response from AI model")
+        return response.text.strip()
+
+    def _record_usage(self, model: str, usage: Dict[str, Any]) -> None:
+        metrics.incr("llm.tokens", usage.get("promptTokenCount") or 0, model=model, kind="prompt")
+        metrics.incr("llm.tokens", usage.get("candidatesTokenCount") or 0, model=model, kind="output")
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, deadline.DeadlineExceeded):
+            return False
+        if isinstance(error, LLMGatewayError):
+            return error.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError))
+
+    async def _hedged_call(
+        self,
+        call: Callable[..., Awaitable[str]],
+        model: str,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        timeout: float,
+        system_instruction: Optional[str],
+        hedge: bool,
+    ) -> str:
+        """
+        One attempt. If it is still running at the p95 latency for this model and prompt
+        size, a budget allows it, and the model has a free concurrency slot, send an
+        identical backup request and return whichever succeeds first.
+        """
+        started = time.perf_counter()
+        delay = self.hedging.hedge_delay(model, len(prompt)) if hedge else None
+        if delay is None or delay >= timeout:
+            text = await call(model, prompt, generation_config, timeout, system_instruction)
+            self.hedging.record(model, len(prompt), time.perf_counter() - started)
+            return text
+
+        async def backup() -> str:
+            async with self._semaphore(model):
+                return await call(model, prompt, generation_config, timeout - delay, system_instruction)
+
+        primary = asyncio.ensure_future(call(model, prompt, generation_config, timeout, system_instruction))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done and not self._semaphore(model).locked() and self.hedging.try_acquire(model):
+                logger.info("LLM call to %s passed p95 (%.1fs), sending a hedged request", model, delay)
+                metrics.incr("llm.hedge", model=model, outcome="sent")
+                pending.add(asyncio.ensure_future(backup()))
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            metrics.incr("llm.hedge", model=model, outcome="won")
+                        self.hedging.record(model, len(prompt), time.perf_counter() - started)
+                        return task.result()
+            # Every request failed: surface the primary's error
+            raise primary.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call_with_retries(
+        self,
+        backend: str,
+        model: str,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        timeout: float,
+        system_instruction: Optional[str] = None,
+        hedge: bool = True,
+    ) -> str:
+        call = self._call_vertex if backend == "vertex" else self._call_genai
+        attempts = settings.LLM_MAX_RETRIES + 1
+        for attempt in range(1, attempts + 1):
+            started = time.perf_counter()
+            try:
+                async with self._semaphore(model):
+                    # Never wait longer than the request has left
+                    attempt_timeout = deadline.stage_timeout(timeout)
+                    text = await self._hedged_call(
+                        call, model, prompt, generation_config, attempt_timeout, system_instruction, hedge
+                    )
+            except Exception as e:
+                metrics.observe("llm.latency", (time.perf_counter() - started) * 1000, model=model)
+                retryable = self._is_retryable(e)
+                metrics.incr("llm.calls", model=model, outcome="retry" if retryable and attempt < attempts else "error")
+                if not retryable or attempt == attempts:
+                    raise
+                # Exponential backoff with jitter: ~0.5s, 1s, 2s ...
+                delay = settings.LLM_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1)) * random.uniform(0.75, 1.25)
+                if not deadline.can_retry(delay + settings.LLM_MIN_ATTEMPT_SECONDS):
+                    logger.warning("LLM call to %s failed (%s), no time left in the request to retry", model, e)
+                    raise
+                logger.warning("LLM call to %s failed (%s), retry %d/%d in %.1fs", model, e, attempt, attempts - 1, delay)
+                await asyncio.sleep(delay)
+                continue
+
+            metrics.observe("llm.latency", (time.perf_counter() - started) * 1000, model=model)
+            metrics.incr("llm.calls", model=model, outcome="ok")
+            return text
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+        backend: str = "genai",
+        timeout: Optional[float] = None,
+        is_cacheable: Optional[Callable[[str], bool]] = None,
+        system_instruction: Optional[str] = None,
+        hedge: bool = True,
+        cache: bool = True,
+    ) -> str:
+        """
+        Generate text with `model`, served from the response cache when possible.
+        `system_instruction` is a static preamble eligible for context caching.
+        `hedge=False` opts the call out of hedged backup requests, `cache=False` out of
+        the response cache (for callers that want a fresh answer every time).
+
+        Raises LLMGatewayError for API errors, and httpx / asyncio timeout errors once
+        retries are exhausted.
+        """
+        generation_config = generation_config or {}
+        timeout = timeout or MODEL_POLICIES.get(model, DEFAULT_POLICY).timeout
+        call = lambda: self._call_with_retries(
+            backend, model, prompt, generation_config, timeout, system_instruction, hedge
+        )
+        if not cache:
+            return await call()
+        return await cached_generate(
+            model,
+            _cache_prompt(prompt, system_instruction),
+            generation_config,
+            call,
+            is_cacheable=is_cacheable,
+        )
+
+    async def _stream_genai(
+        self,
+        model: str,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        timeout: float,
+        system_instruction: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        api_key = settings.SCOPIFY_GOOGLE_AI_API_KEY
+        if not api_key:
+            raise LLMGatewayError(None, "Google AI API key is not configured")
+
+        target, body, cached = await self._genai_request(model, prompt, generation_config, system_instruction)
+        async with self._http_client().stream(
+            "POST",
+            f"/models/{target}:streamGenerateContent",
+            params={"alt": "sse"},
+            headers={"x-goog-api-key": api_key},
+            json=body,
+            timeout=timeout,
+        ) as response:
+            if response.status_code != 200:
+                error_body = (await response.aread()).decode("utf-8", "replace")
+                if cached is not None and response.status_code in STALE_CACHE_STATUS_CODES:
+                    # The cache went away server-side; the retry sends the instruction inline
+                    self.context_cache.invalidate(cached)
+                    raise LLMGatewayError(503, f"Context cache {cached.name} is no longer available")
+                raise LLMGatewayError(response.status_code, f"Google AI API error: {response.status_code} - {error_body}")
+
+            usage: Dict[str, Any] = {}
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                chunk = orjson.loads(line[5:])
+                usage = chunk.get("usageMetadata") or usage
+                for candidate in chunk.get("candidates") or []:
+                    for part in (candidate.get("content") or {}).get("parts") or []:
+                        if part.get("text"):
+                            yield part["text"]
+            self._record_usage(model, usage)
+
+    async def stream(
+        self,
+        model: str,
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        system_instruction: Optional[str] = None,
+        is_cacheable: Optional[Callable[[str], bool]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Yield response text fragments as they are generated (streamGenerateContent over SSE).
+
+        A cached response is replayed as a single fragment, and a completed stream is
+        cached like generate(), subject to `is_cacheable`. Retries happen only before
+        the first fragment arrives.
+        """
+        generation_config = generation_config or {}
+        timeout = timeout or MODEL_POLICIES.get(model, DEFAULT_POLICY).timeout
+
+        key = make_llm_cache_key(model, _cache_prompt(prompt, system_instruction), generation_config)
+        if settings.LLM_CACHE_ENABLED:
+            try:
+                cached = await llm_response_cache.aget(key)
+            except Exception as e:
+                logger.warning("LLM cache lookup failed: %s", e)
+                cached = None
+            if cached is not None:
+                logger.info("LLM cache hit: model=%s key=%s", model, key[:12])
+                yield cached
+                return
+
+        attempts = settings.LLM_MAX_RETRIES + 1
+        for attempt in range(1, attempts + 1):
+            started = time.perf_counter()
+            fragments = []
+            try:
+                async with self._semaphore(model):
+                    attempt_timeout = deadline.stage_timeout(timeout)
+                    async for fragment in self._stream_genai(
+                        model, prompt, generation_config, attempt_timeout, system_instruction
+                    ):
+                        if not fragments:
+                            metrics.observe("llm.first_token_latency", (time.perf_counter() - started) * 1000, model=model)
+                        fragments.append(fragment)
+                        yield fragment
+            except Exception as e:
+                metrics.observe("llm.latency", (time.perf_counter() - started) * 1000, model=model)
+                retryable = self._is_retryable(e) and not fragments
+                metrics.incr("llm.calls", model=model, outcome="retry" if retryable and attempt < attempts else "error")
+                if not retryable or attempt == attempts:
+                    raise
+                delay = settings.LLM_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1)) * random.uniform(0.75, 1.25)
+                if not deadline.can_retry(delay + settings.LLM_MIN_ATTEMPT_SECONDS):
+                    logger.warning("LLM stream from %s failed (%s), no time left in the request to retry", model, e)
+                    raise
+                logger.warning("LLM stream from %s failed (%s), retry %d/%d in %.1fs", model, e, attempt, attempts - 1, delay)
+                await asyncio.sleep(delay)
+                continue
+
+            metrics.observe("llm.latency", (time.perf_counter() - started) * 1000, model=model)
+            metrics.incr("llm.calls", model=model, outcome="ok")
+            text = "".join(fragments)
+            if text and settings.LLM_CACHE_ENABLED and (is_cacheable is None or is_cacheable(text)):
+                try:
+                    await llm_response_cache.aset(key, text)
+                except Exception as e:
+                    logger.warning("LLM cache write failed: %s", e)
+            return
+
+
+llm_gateway = LLMGateway()
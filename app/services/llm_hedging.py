@@ -0,0 +1,74 @@
+"""
+Hedged Gemini calls for tail latency.
+
+Latencies of successful calls are tracked per (model, prompt size bucket). Once
+a call has run past the observed p95 for its bucket, the gateway may fire one
+identical backup request and take whichever answers first. Hedges draw from a
+global budget that grows by LLM_HEDGE_BUDGET_RATIO per call, so they add at most
+that fraction of extra calls (5% by default) however slow the upstream gets.
+"""
+import logging
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+HEDGE_QUANTILE = 0.95
+# Recent latencies kept per bucket
+LATENCY_WINDOW = 200
+# Unspent budget carried over, so a quiet period cannot bank a burst of hedges
+MAX_BUDGET_TOKENS = 10.0
+
+
+def _size_bucket(prompt_chars: int) -> int:
+    """Power-of-two bucket of the estimated prompt tokens (~4 chars per token)."""
+    return max(prompt_chars // 4, 1).bit_length()
+
+
+class HedgePolicy:
+    def __init__(self):
+        self._latencies: Dict[Tuple[str, int], Deque[float]] = {}
+        self._budget = 0.0
+        self._calls = 0
+        self._hedges = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buckets": len(self._latencies),
+            "calls": self._calls,
+            "hedges": self._hedges,
+            "budget": round(self._budget, 2),
+        }
+
+    def record(self, model: str, prompt_chars: int, seconds: float) -> None:
+        """Latency of a successful call, from the first request to the answer used."""
+        window = self._latencies.setdefault((model, _size_bucket(prompt_chars)), deque(maxlen=LATENCY_WINDOW))
+        window.append(seconds)
+
+    def hedge_delay(self, model: str, prompt_chars: int) -> Optional[float]:
+        """
+        Seconds to wait before hedging a new call, or None to not hedge it.
+        Every call (hedged or not) adds to the hedge budget.
+        """
+        self._calls += 1
+        self._budget = min(self._budget + settings.LLM_HEDGE_BUDGET_RATIO, MAX_BUDGET_TOKENS)
+        if not settings.LLM_HEDGE_ENABLED:
+            return None
+        window = self._latencies.get((model, _size_bucket(prompt_chars)))
+        if not window or len(window) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(window)
+        return ordered[min(len(ordered) - 1, math.ceil(HEDGE_QUANTILE * len(ordered)) - 1)]
+
+    def try_acquire(self, model: str) -> bool:
+        """Spend one hedge from the budget; False if it is exhausted."""
+        if self._budget < 1.0:
+            metrics.incr("llm.hedge", model=model, outcome="no_budget")
+            return False
+        self._budget -= 1.0
+        self._hedges += 1
+        return True
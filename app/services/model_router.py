@@ -0,0 +1,105 @@
+"""
+Model routing: pick the cheapest Gemini model that meets a task's quality bar
+and latency SLO for a given input size.
+
+Each task lists candidate models cheapest first, each with the largest input
+(in tokens) it handles at acceptable quality for that task. A candidate is
+chosen if the input fits its context window, is within its quality cap, and its
+estimated latency is within the task's SLO. Settings.LLM_ROUTE_OVERRIDES pins a
+task to a model. Every decision is counted in the llm.route metric.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    context_window: int
+    first_token_seconds: float
+    input_tokens_per_second: float
+    output_tokens_per_second: float
+
+    def estimated_seconds(self, input_tokens: int, output_tokens: int) -> float:
+        return (
+            self.first_token_seconds
+            + input_tokens / self.input_tokens_per_second
+            + output_tokens / self.output_tokens_per_second
+        )
+
+
+# Rough throughput figures; only their relative order matters for routing
+MODEL_PROFILES: Dict[str, ModelProfile] = {
+    "gemini-1.5-flash": ModelProfile(1_048_576, 0.5, 20_000, 150),
+    "gemini-2.0-flash-exp": ModelProfile(1_048_576, 0.5, 20_000, 150),
+    "gemini-1.5-pro": ModelProfile(2_097_152, 1.5, 8_000, 60),
+}
+
+
+@dataclass(frozen=True)
+class TaskRoute:
+    # (model, max input tokens at acceptable quality or None for no cap), cheapest first
+    candidates: Tuple[Tuple[str, Optional[int]], ...]
+    expected_output_tokens: int
+    slo_seconds: float
+
+
+TASK_ROUTES: Dict[str, TaskRoute] = {
+    "company_search": TaskRoute((("gemini-1.5-flash", None), ("gemini-1.5-pro", None)), 800, 30.0),
+    # Short decks summarize well on flash; longer ones need pro to keep the sections coherent
+    "pitchdeck_summary": TaskRoute((("gemini-1.5-flash", 3000), ("gemini-1.5-pro", None)), 1500, 60.0),
+    "pitchdeck_map": TaskRoute((("gemini-1.5-flash", None),), 500, 30.0),
+    # Vertex backend: candidates must be Vertex model names
+    "document_extraction": TaskRoute((("gemini-2.0-flash-exp", None), ("gemini-1.5-pro", None)), 400, 45.0),
+}
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    task: str
+    model: str
+    reason: str
+    input_tokens: int
+
+
+def _decide(task: str, input_tokens: int) -> Tuple[str, str]:
+    override = settings.LLM_ROUTE_OVERRIDES.get(task)
+    if override:
+        return override, "override"
+
+    route = TASK_ROUTES[task]
+    fits = [
+        (model, quality_cap)
+        for model, quality_cap in route.candidates
+        if input_tokens + route.expected_output_tokens <= MODEL_PROFILES[model].context_window
+    ]
+    if not fits:
+        # Nothing fits: the largest model is the least bad option
+        return route.candidates[-1][0], "overflow"
+
+    capable = [model for model, quality_cap in fits if quality_cap is None or input_tokens <= quality_cap]
+    if not capable:
+        return fits[-1][0], "quality_fallback"
+
+    for model in capable:
+        if MODEL_PROFILES[model].estimated_seconds(input_tokens, route.expected_output_tokens) <= route.slo_seconds:
+            return model, "cheapest"
+
+    fastest = min(
+        capable,
+        key=lambda model: MODEL_PROFILES[model].estimated_seconds(input_tokens, route.expected_output_tokens),
+    )
+    return fastest, "slo_fallback"
+
+
+def route_model(task: str, input_tokens: int) -> RouteDecision:
+    """Choose the model for `task` given the estimated prompt size in tokens."""
+    model, reason = _decide(task, input_tokens)
+    metrics.incr("llm.route", task=task, model=model, reason=reason)
+    logger.info("Routed %s (~%d input tokens) to %s (%s)", task, input_tokens, model, reason)
+    return RouteDecision(task=task, model=model, reason=reason, input_tokens=input_tokens)
@@ -1,35 +1,36 @@
 
 ## `app/services/pitchdeck_ai_service.py`
 
+import asyncio
+import logging
 import httpx
-import json
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, List, Tuple
 from fastapi import HTTPException, status
 
+from app.core.deadline import DeadlineExceeded
 from app.core.config import settings
-
-
-class PitchdeckAIService:
-    def __init__(self):
-        self.api_key = settings.SCOPIFY_GOOGLE_AI_API_KEY
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta"
-
-        if not self.api_key:
-            raise ValueError("Google AI API key is not configured")
-
-    async def summarize_structured_data(self, structured: Dict[str, Any], filename: str) -> Dict[str, Any]:
-        """
-        Take normalized structured data from Doc processor and return a JSON with analytical sections.
-        """
-        # Compose a prompt that uses both the flattened text and slide-by-slide context
-        text = structured.get("text", "")
-        slides = structured.get("slides", [])
-
-        slides_summary = "\n".join(
-            [f"Slide {s.get('slide')}: {' | '.join(s.get('texts', [])[:3])}" for s in slides]
-        )
-
-        prompt = f"""
+from app.schemas.ai_output import PitchdeckSummaryOutput
+from app.services.context_packer import (
+    ContextSegment,
+    build_segments,
+    chunk_segments,
+    estimate_tokens,
+    pack_context,
+    render_segments,
+)
+from app.services.llm_gateway import LLMGatewayError, llm_gateway
+from app.services.model_router import route_model
+from app.utils.gemini_schema import to_response_schema
+from app.utils.json_extract import extract_json
+from app.utils.json_stream import JsonSectionParser
+
+logger = logging.getLogger(__name__)
+
+PITCHDECK_SUMMARY_SCHEMA = to_response_schema(PitchdeckSummaryOutput)
+
+# Static instructions are sent as the system instruction (context-cached where supported);
+# only the document content varies per call
+SUMMARY_INSTRUCTIONS = """
 You are an investment analyst. Given the extracted content from a pitchdeck, produce a JSON object with the following keys:
 - company_info (name, logo, website, HQ, sector, stage, intro_source)
 - deal_context (why_now, round_size, valuation, lead_investor, syndicate)
@@ -44,74 +45,192 @@ You are an investment analyst. Given the extracted content from a pitchdeck, pro
 - valuation_multiples (ev_revenue, ev_ebitda, p_e, ev_gmv, ev_users, ev_arr)
 
 Return valid JSON only.
+"""
 
-Context text:
+MAP_INSTRUCTIONS = """
+You are an investment analyst reading one part of a larger pitchdeck or data room.
+Write concise bullet-point notes of every fact in it that an investment memo would need:
+company and product, founders and team, traction and financial figures, market size and
+competitors, fundraising terms, risks. Keep numbers, names and dates exactly as written.
+Do not speculate about content that is not in this part. Return plain text notes only.
 """
 
-        # Truncate if too large (best-effort)
-        max_context = 20000
-        combined = (text or "") + "\n\n" + slides_summary
-        if len(combined) > max_context:
-            combined = combined[:max_context]
-
-        full_prompt = prompt + "\n\n" + combined
-
-        payload = {
-            "contents": [{"parts": [{"text": full_prompt.strip()}]}],
-            "generationConfig": {
-                "temperature": 0.2,
-                "topK": 40,
-                "topP": 0.95,
-                "maxOutputTokens": 4096,
-            },
-        }
+SUMMARY_GENERATION_CONFIG = {
+    "temperature": 0.2,
+    "topK": 40,
+    "topP": 0.95,
+    "maxOutputTokens": 4096,
+    # Constrain output to the eleven summary sections so it always parses
+    "responseMimeType": "application/json",
+    "responseSchema": PITCHDECK_SUMMARY_SCHEMA,
+}
+
+REDUCE_PREAMBLE = """
+The context below is a set of analyst notes, one per consecutive part of the document,
+rather than the raw document. Merge them into a single assessment.
+"""
 
-        try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                resp = await client.post(
-                    f"{self.base_url}/models/gemini-1.5-pro:generateContent?key={self.api_key}",
-                    headers={"Content-Type": "application/json"},
-                    json=payload,
-                )
 
-            if resp.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Google AI API error: {resp.status_code} - {resp.text}",
-                )
+class PitchdeckAIService:
+    def __init__(self):
+        self.api_key = settings.SCOPIFY_GOOGLE_AI_API_KEY
 
-            result = resp.json()
-            if "candidates" not in result or not result["candidates"]:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="No response generated from Google AI",
-                )
+        if not self.api_key:
+            raise ValueError("Google AI API key is not configured")
 
-            generated_text = result["candidates"][0]["content"]["parts"][0]["text"]
+    async def _summarize_chunks(self, chunks: List[List[ContextSegment]]) -> Tuple[str, List[str]]:
+        """
+        Map step: note-take each chunk with the fast model, at most
+        PITCHDECK_MAP_CONCURRENCY calls at a time. Returns the notes in document order,
+        with a placeholder for each chunk that failed, and the labels of those chunks.
+        """
+        semaphore = asyncio.Semaphore(settings.PITCHDECK_MAP_CONCURRENCY)
+        generation_config = {
+            "temperature": 0.1,
+            "topK": 40,
+            "topP": 0.95,
+            "maxOutputTokens": 1024,
+        }
 
-            try:
-                parsed = json.loads(generated_text)
-            except json.JSONDecodeError:
-                # Best-effort fallback: wrap raw text
-                parsed = {"raw_response": generated_text}
+        async def _map(chunk: List[ContextSegment]) -> str:
+            prompt = "Content:\n\n" + render_segments(chunk)
+            route = route_model("pitchdeck_map", estimate_tokens(MAP_INSTRUCTIONS + prompt))
+            async with semaphore:
+                return await llm_gateway.generate(
+                    route.model, prompt, generation_config, system_instruction=MAP_INSTRUCTIONS.strip()
+                )
 
-            return {
-                "filename": filename,
-                "structured_summary": parsed,
-                "ai_model": "gemini-1.5-pro",
-                "status": "success",
-            }
+        results = await asyncio.gather(*(_map(chunk) for chunk in chunks), return_exceptions=True)
+
+        notes = []
+        missing: List[str] = []
+        for chunk, result in zip(chunks, results):
+            label = chunk[0].label if len(chunk) == 1 else f"{chunk[0].label} - {chunk[-1].label}"
+            if isinstance(result, BaseException):
+                logger.warning("Map step failed for %s: %s", label, result)
+                missing.append(label)
+                # Keep the gap visible to the reduce step rather than presenting a complete document
+                notes.append(f"{label}:\n[Notes unavailable: this part of the document could not be summarized]")
+                continue
+            notes.append(f"{label}:\n{result.strip()}")
+
+        if len(missing) == len(chunks):
+            # Every chunk failed; surface the first error the same way a single call would
+            raise results[0]
+        logger.info("Map step summarized %d/%d chunks", len(chunks) - len(missing), len(chunks))
+        return "\n\n".join(notes), missing
+
+    async def _build_prompt(self, structured: Dict[str, Any], filename: str) -> Tuple[str, str, List[str]]:
+        """
+        (system instruction, prompt, labels of parts missing from the prompt) for the summary call.
 
-        except httpx.TimeoutException:
-            raise HTTPException(
+        Documents above PITCHDECK_MAP_REDUCE_THRESHOLD_TOKENS are chunked by slide / page and
+        summarized in parallel first; the prompt then carries those notes instead of the raw text.
+        """
+        missing: List[str] = []
+        segments = build_segments(structured)
+        content_tokens = sum(segment.tokens for segment in segments)
+
+        if content_tokens > settings.PITCHDECK_MAP_REDUCE_THRESHOLD_TOKENS:
+            chunks = chunk_segments(segments, settings.PITCHDECK_MAP_CHUNK_TOKENS)
+            logger.info(
+                "Map-reduce summary for %s: ~%d tokens in %d chunks", filename, content_tokens, len(chunks)
+            )
+            instructions = REDUCE_PREAMBLE + SUMMARY_INSTRUCTIONS
+            combined, missing = await self._summarize_chunks(chunks)
+        else:
+            instructions = SUMMARY_INSTRUCTIONS
+            # Slide text de-duplicated against the flat text, densest content first, within the token budget
+            combined = pack_context(structured, settings.PITCHDECK_CONTEXT_TOKEN_BUDGET)
+
+        return instructions.strip(), "Context text:\n\n" + combined, missing
+
+    def _http_error(self, error: Exception) -> HTTPException:
+        if isinstance(error, LLMGatewayError):
+            return HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=error.message,
+            )
+        if isinstance(error, DeadlineExceeded):
+            return HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Request deadline exceeded",
+            )
+        if isinstance(error, httpx.TimeoutException):
+            return HTTPException(
                 status_code=status.HTTP_408_REQUEST_TIMEOUT,
                 detail="Request to Google AI API timed out",
             )
-        except httpx.RequestError as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error connecting to Google AI API: {str(e)}",
+        return HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error connecting to Google AI API: {str(error)}",
+        )
+
+    def _summary_result(
+        self, filename: str, generated_text: str, model: str, missing_sections: List[str]
+    ) -> Dict[str, Any]:
+        parsed = extract_json(generated_text)
+        if parsed is None:
+            # Best-effort fallback: wrap raw text
+            parsed = {"raw_response": generated_text}
+
+        return {
+            "filename": filename,
+            "structured_summary": parsed,
+            "ai_model": model,
+            "status": "success",
+            # Parts of the document whose map step failed and are absent from the summary
+            "partial": bool(missing_sections),
+            "missing_sections": missing_sections,
+        }
+
+    async def summarize_structured_data(self, structured: Dict[str, Any], filename: str) -> Dict[str, Any]:
+        """
+        Take normalized structured data from Doc processor and return a JSON with analytical sections.
+        `partial` / `missing_sections` report parts of a long document that could not be summarized.
+        """
+        try:
+            instructions, prompt, missing = await self._build_prompt(structured, filename)
+            route = route_model("pitchdeck_summary", estimate_tokens(instructions + prompt))
+            # An unchanged deck produces the same prompt, so it is served from the response cache
+            generated_text = await llm_gateway.generate(
+                route.model,
+                prompt,
+                SUMMARY_GENERATION_CONFIG,
+                system_instruction=instructions,
+                is_cacheable=lambda text: extract_json(text) is not None,
             )
+            return self._summary_result(filename, generated_text, route.model, missing)
+
+        except (LLMGatewayError, DeadlineExceeded, httpx.RequestError) as e:
+            raise self._http_error(e)
+
+    async def stream_structured_data(
+        self, structured: Dict[str, Any], filename: str
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of summarize_structured_data. Yields ("section", {"name", "value"})
+        as each top-level section of the JSON finishes generating, then ("complete", result)
+        with the same result summarize_structured_data returns.
+        """
+        try:
+            instructions, prompt, missing = await self._build_prompt(structured, filename)
+            route = route_model("pitchdeck_summary", estimate_tokens(instructions + prompt))
+            parser = JsonSectionParser()
+            async for fragment in llm_gateway.stream(
+                route.model,
+                prompt,
+                SUMMARY_GENERATION_CONFIG,
+                system_instruction=instructions,
+                is_cacheable=lambda text: extract_json(text) is not None,
+            ):
+                for name, value in parser.feed(fragment):
+                    yield "section", {"name": name, "value": value}
+
+        except (LLMGatewayError, DeadlineExceeded, httpx.RequestError) as e:
+            raise self._http_error(e)
+
+        yield "complete", self._summary_result(filename, parser.text, route.model, missing)
 
 
 pitchdeck_ai_service = PitchdeckAIService()
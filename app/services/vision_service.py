@@ -4,6 +4,7 @@ import mimetypes
 from typing import Dict, Any
 from google.cloud import vision, storage
 import json
+from app.core import deadline
 from app.core.config import settings
 import re
 
@@ -73,7 +74,8 @@ class VisionService:
 
             operation = self.client.async_batch_annotate_files(requests=[async_request])
             logger.info("Waiting for Vision API async operation to finish...")
-            operation.result(timeout=420)
+            # Up to 420s, but never past the request deadline
+            operation.result(timeout=deadline.stage_timeout(420))
 
             # Fetch output JSON(s) from GCS
             storage_client = storage.Client()
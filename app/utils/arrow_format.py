@@ -0,0 +1,36 @@
+"""
+Bulk encoders for Arrow tables read from BigQuery.
+
+Rows are converted column-wise by pyarrow (to_pylist) and serialized with
+orjson in one pass, instead of building a dict per REST row in Python.
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+import pyarrow as pa
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def json_default(value: Any) -> Any:
+    # NUMERIC columns come back as Decimal; encode them as FastAPI would
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def to_ndjson(table: pa.Table) -> bytes:
+    """One JSON object per row, newline-terminated."""
+    return b"".join(
+        orjson.dumps(row, default=json_default, option=orjson.OPT_APPEND_NEWLINE) for row in table.to_pylist()
+    )
+
+
+def to_ipc_stream(table: pa.Table) -> bytes:
+    """Arrow IPC streaming format, readable with pyarrow.ipc.open_stream / apache-arrow JS."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,231 @@
+"""
+Pluggable key/value caches with TTL and size-bounded eviction.
+
+Backends store string values. TieredCache layers several backends (e.g. an
+in-memory LRU in front of a SQLite file), promotes lower-tier hits for the rest
+of their lifetime and keeps hit/miss counts per tier.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class CacheBackend(ABC):
+    """Interface for cache tiers. `blocking` backends are called off the event loop."""
+
+    name = "backend"
+    blocking = False
+
+    @abstractmethod
+    def get_entry(self, key: str) -> Optional[Tuple[str, float]]:
+        """(value, expires_at as a time.time() timestamp), or None if missing or expired."""
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class MemoryLRUBackend(CacheBackend):
+    """In-process LRU bounded by entry count; expired entries are dropped on read."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value, expires_at
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Local disk tier backed by a single SQLite file. Expired rows and the least
+    recently used rows beyond max_entries are pruned every `prune_every` writes.
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int = 10000, prune_every: int = 100):
+        self.path = path
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+
+    def get_entry(self, key: str) -> Optional[Tuple[str, float]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return value, expires_at
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        expired = self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+        overflow = self._conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            " SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        self.evictions += max(expired, 0) + max(overflow, 0)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class TieredCache:
+    """Read-through over ordered backends (fastest first) with per-tier hit counts."""
+
+    def __init__(self, name: str, backends: List[CacheBackend], ttl: float):
+        self.name = name
+        self.backends = backends
+        self.ttl = ttl
+        self.hits: Dict[str, int] = {backend.name: 0 for backend in backends}
+        self.misses = 0
+        self.sets = 0
+        self._blocking = any(backend.blocking for backend in backends)
+
+    def get(self, key: str) -> Optional[str]:
+        for index, backend in enumerate(self.backends):
+            entry = backend.get_entry(key)
+            if entry is not None:
+                value, expires_at = entry
+                self.hits[backend.name] += 1
+                # Promote for what is left of the entry's lifetime, not a fresh TTL
+                remaining = expires_at - time.time()
+                if remaining > 0:
+                    for upper in self.backends[:index]:
+                        upper.set(key, value, remaining)
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self.sets += 1
+        for backend in self.backends:
+            backend.set(key, value, ttl or self.ttl)
+
+    def delete(self, key: str) -> None:
+        for backend in self.backends:
+            backend.delete(key)
+
+    def clear(self) -> None:
+        for backend in self.backends:
+            backend.clear()
+
+    async def aget(self, key: str) -> Optional[str]:
+        if self._blocking:
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def aset(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        if self._blocking:
+            await asyncio.to_thread(self.set, key, value, ttl)
+        else:
+            self.set(key, value, ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = sum(self.hits.values())
+        lookups = hits + self.misses
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "sets": self.sets,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": {backend.name: len(backend) for backend in self.backends},
+            "evictions": {backend.name: getattr(backend, "evictions", 0) for backend in self.backends},
+        }
@@ -0,0 +1,49 @@
+"""
+Stop working on requests whose client has gone away.
+
+cancel_on_disconnect() runs an endpoint's upstream work as a task and polls
+request.is_disconnected() while it runs. When the client disconnects the task
+is cancelled, which cancels everything it is awaiting (agent and Gemini calls,
+retry backoffs, fallbacks) and skips the database writes that would follow.
+Blocking calls already running in a worker thread finish, but their results
+are dropped.
+"""
+import asyncio
+import logging
+from typing import Awaitable, TypeVar
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Non-standard "client closed request" status; never reaches the client
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """Await `work`, cancelling it and raising HTTPException(499) if the client disconnects first."""
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.CLIENT_DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                break
+    finally:
+        # Also reached if this coroutine itself is cancelled
+        if not task.done():
+            task.cancel()
+
+    # Let the cancellation unwind (semaphores, sessions) before answering
+    await asyncio.wait({task})
+    if not task.cancelled():
+        task.exception()
+    logger.info("Client disconnected from %s, cancelled in-flight work", request.url.path)
+    metrics.incr("http.client_disconnected", path=request.url.path)
+    raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
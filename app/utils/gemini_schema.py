@@ -0,0 +1,56 @@
+"""
+Convert Pydantic models to the OpenAPI subset Gemini accepts as responseSchema:
+no $ref/$defs, no titles/defaults/additionalProperties, Optional[X] as
+{"nullable": true}, upper-case type names.
+"""
+from typing import Any, Dict, Type
+
+from pydantic import BaseModel
+
+_DROPPED_KEYS = {"title", "default", "additionalProperties", "$defs"}
+
+
+def _resolve_ref(ref: str, defs: Dict[str, Any]) -> Dict[str, Any]:
+    return defs[ref.rsplit("/", 1)[-1]]
+
+
+def _convert(node: Dict[str, Any], defs: Dict[str, Any], property_ordering: bool) -> Dict[str, Any]:
+    if "$ref" in node:
+        return _convert(_resolve_ref(node["$ref"], defs), defs, property_ordering)
+
+    if "anyOf" in node:
+        variants = [variant for variant in node["anyOf"] if variant.get("type") != "null"]
+        nullable = len(variants) != len(node["anyOf"])
+        converted = _convert(variants[0], defs, property_ordering) if len(variants) == 1 else {"type": "STRING"}
+        if nullable:
+            converted["nullable"] = True
+        if "description" in node:
+            converted["description"] = node["description"]
+        return converted
+
+    schema: Dict[str, Any] = {}
+    for key, value in node.items():
+        if key in _DROPPED_KEYS:
+            continue
+        if key == "type":
+            schema["type"] = value.upper()
+        elif key == "properties":
+            schema["properties"] = {
+                name: _convert(prop, defs, property_ordering) for name, prop in value.items()
+            }
+            if property_ordering:
+                schema["propertyOrdering"] = list(value.keys())
+        elif key == "items":
+            schema["items"] = _convert(value, defs, property_ordering)
+        elif key in ("required", "enum", "format", "description"):
+            schema[key] = value
+    return schema
+
+
+def to_response_schema(model: Type[BaseModel], property_ordering: bool = True) -> Dict[str, Any]:
+    """
+    Gemini responseSchema for `model`. propertyOrdering (Gemini API) keeps fields in
+    declaration order; pass property_ordering=False for the Vertex SDK dict form.
+    """
+    json_schema = model.model_json_schema()
+    return _convert(json_schema, json_schema.get("$defs", {}), property_ordering)
@@ -0,0 +1,137 @@
+"""
+Single-pass extraction of JSON blocks from LLM / agent response text.
+
+Model output is usually either bare JSON, JSON inside a ```json fence, or JSON
+surrounded by prose. The scanner below walks the text once, jumping between
+structural characters and whole string literals with C-level regex searches and
+keeping a stack of open brackets, so no part of the text is scanned twice.
+"""
+import re
+from typing import Any, Iterator, List, Optional, Tuple
+
+import orjson
+
+# Opening fence (``` or ```json) up to the end of its line, and the closing fence
+_FENCE_OPEN_RE = re.compile(r"```(?:json)?[^\n]*\n?", re.IGNORECASE)
+_FENCE_CLOSE = "```"
+
+_OPEN_RE = re.compile(r"[{\[]")
+# Whole JSON string literals (escape-aware) or a single bracket
+_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]', re.S)
+
+
+def loads(data: Any) -> Any:
+    """orjson.loads; raises ValueError (json.JSONDecodeError subclass) on invalid input."""
+    return orjson.loads(data)
+
+
+def iter_json_blocks(text: str, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) offsets of balanced top-level {...} / [...] blocks, in one pass.
+
+    Outside a block only opening brackets are looked for, so quotes in surrounding
+    prose do not matter; inside a block, brackets in string literals are ignored. An
+    opening bracket that never closes does not make a block: the complete blocks
+    inside it are yielded instead (after the text is scanned), so nothing is rescanned.
+    """
+    stop = len(text) if end is None else end
+    pos = start
+    # Currently open brackets: (offset, complete blocks found directly inside it)
+    open_blocks: List[Tuple[int, List[Tuple[int, int]]]] = []
+    while True:
+        token = (_TOKEN_RE if open_blocks else _OPEN_RE).search(text, pos, stop)
+        if not token:
+            break
+        pos = token.end()
+        ch = text[token.start()]
+        if ch == "{" or ch == "[":
+            open_blocks.append((token.start(), []))
+        elif ch == "}" or ch == "]":
+            begin, _ = open_blocks.pop()
+            if open_blocks:
+                open_blocks[-1][1].append((begin, pos))
+            else:
+                yield begin, pos
+
+    # Blocks inside an unclosed bracket come before the next unclosed bracket opens
+    for _, inner in open_blocks:
+        yield from inner
+
+
+def _iter_fenced_bodies(text: str) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) offsets of ``` fenced bodies; an unclosed fence runs to the end."""
+    pos = 0
+    while True:
+        fence = _FENCE_OPEN_RE.search(text, pos)
+        if not fence:
+            return
+        body_start = fence.end()
+        close = text.find(_FENCE_CLOSE, body_start)
+        if close == -1:
+            yield body_start, len(text)
+            return
+        yield body_start, close
+        pos = close + len(_FENCE_CLOSE)
+
+
+def _first_parsed(text: str, start: int, end: int) -> Optional[Any]:
+    """
+    First block in text[start:end] that parses to a dict. A block that does not parse
+    may have started at a bracket in prose (e.g. a quoted "{"), so its inside is scanned
+    again, up to one extra pass over the text in total so the search stays linear.
+    """
+    budget = end - start
+    scans = [iter_json_blocks(text, start, end)]
+    while scans:
+        for block_start, block_end in scans[-1]:
+            try:
+                value = orjson.loads(text[block_start:block_end])
+            except orjson.JSONDecodeError:
+                if block_end - block_start - 1 <= budget:
+                    budget -= block_end - block_start - 1
+                    scans.append(iter_json_blocks(text, block_start + 1, block_end))
+                    break
+                continue
+            if isinstance(value, dict):
+                return value
+        else:
+            scans.pop()
+    return None
+
+
+def _parse_whole(text: str, allow_array: bool) -> Optional[Any]:
+    if text[:1] not in ("{", "["):
+        return None
+    try:
+        value = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return None
+    if isinstance(value, dict) or (allow_array and isinstance(value, list)):
+        return value
+    return None
+
+
+def extract_json(text: Optional[str], allow_array: bool = False) -> Optional[Any]:
+    """
+    Return the first JSON object found in text, or None.
+
+    Order of attempts: the whole (stripped) text, fenced ```json bodies, then any
+    balanced block in the text. With allow_array, a JSON array is also returned when
+    it is the whole text or a whole fenced body (as a strict json.loads would).
+    """
+    if not text:
+        return None
+
+    value = _parse_whole(text.strip(), allow_array)
+    if value is not None:
+        return value
+
+    if _FENCE_CLOSE in text:
+        for body_start, body_end in _iter_fenced_bodies(text):
+            value = _parse_whole(text[body_start:body_end].strip(), allow_array)
+            if value is None:
+                value = _first_parsed(text, body_start, body_end)
+            if value is not None:
+                return value
+
+    return _first_parsed(text, 0, len(text))
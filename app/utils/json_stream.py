@@ -0,0 +1,78 @@
+"""
+Incremental parsing of a streamed JSON object, one top-level member at a time.
+
+Streaming model output arrives as arbitrary text fragments. JsonSectionParser
+scans each fragment once, tracking string / escape state and nesting depth,
+and emits a top-level member (e.g. "company_info": {...}) as soon as the
+comma or closing brace that ends it arrives.
+"""
+from typing import Any, List, Optional, Tuple
+
+import orjson
+
+
+class JsonSectionParser:
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start: Optional[int] = None
+        self.done = False
+
+    def feed(self, fragment: str) -> List[Tuple[str, Any]]:
+        """Add streamed text; return the (key, value) members completed by it, in order."""
+        if not fragment or self.done:
+            return []
+        self._text += fragment
+        completed: List[Tuple[str, Any]] = []
+
+        text = self._text
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1 and char == "{":
+                    self._member_start = pos + 1
+            elif char in "}]":
+                if self._depth == 1:
+                    self._emit(text, pos, completed)
+                    self.done = True
+                    self._pos = pos + 1
+                    return completed
+                self._depth -= 1
+            elif char == "," and self._depth == 1:
+                self._emit(text, pos, completed)
+                self._member_start = pos + 1
+
+        self._pos = len(text)
+        return completed
+
+    def _emit(self, text: str, end: int, completed: List[Tuple[str, Any]]) -> None:
+        if self._member_start is None:
+            return
+        member = text[self._member_start:end].strip()
+        if not member:
+            return
+        try:
+            parsed = orjson.loads("{" + member + "}")
+        except orjson.JSONDecodeError:
+            return
+        completed.extend(parsed.items())
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._text
@@ -0,0 +1,6 @@
+from typing import Optional
+
+
+def normalize_key(value: Optional[str]) -> str:
+    """Case- and whitespace-insensitive form of a name or query, for use as a lookup key."""
+    return " ".join((value or "").split()).casefold()
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark for app.utils.json_extract.extract_json.
+
+Builds multi-object responses of increasing size (prose with bracketed citations,
+many non-matching JSON arrays, braces inside strings, and the target object last)
+and reports time per KB, which should stay flat as the input grows. The second
+table is the worst case for a rescanning scanner: thousands of opening braces
+that never close, followed by the target object.
+
+    python -m benchmarks.bench_json_extract
+"""
+import json
+import time
+
+from app.utils.json_extract import extract_json
+
+SIZES_KB = [64, 128, 256, 512, 1024]
+UNCLOSED_OPENERS = [2_000, 4_000, 8_000, 16_000, 64_000]
+REPEAT = 5
+
+
+def _build_response(size_kb: int) -> str:
+    filler_unit = 'Revenue grew 40% [1] and the {draft} note says "use } carefully". '
+    array_unit = json.dumps([{"slide": i, "text": "a } b { c"} for i in range(5)]) + "\n"
+    target = json.dumps({"company_name": "Acme", "key_products": ["x", "y"], "team_size": 12})
+
+    parts = []
+    size = 0
+    budget = size_kb * 1024 - len(target) - 16
+    while size < budget:
+        parts.append(filler_unit)
+        parts.append(array_unit)
+        size += len(filler_unit) + len(array_unit)
+    parts.append("Result: " + target)
+    return "".join(parts)
+
+
+def _build_unclosed(openers: int) -> str:
+    return "{ " * openers + json.dumps({"company_name": "Acme"})
+
+
+def _best_seconds(text: str) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = extract_json(text)
+        best = min(best, time.perf_counter() - started)
+    assert result and result["company_name"] == "Acme"
+    return best
+
+
+def main() -> None:
+    print(f"{'size':>8} {'best ms':>10} {'us/KB':>8}")
+    for size_kb in SIZES_KB:
+        best = _best_seconds(_build_response(size_kb))
+        print(f"{size_kb:>6}KB {best * 1000:>10.2f} {best * 1e6 / size_kb:>8.2f}")
+
+    print(f"\n{'unclosed':>8} {'best ms':>10} {'us/open':>8}")
+    for openers in UNCLOSED_OPENERS:
+        best = _best_seconds(_build_unclosed(openers))
+        print(f"{openers:>8} {best * 1000:>10.2f} {best * 1e6 / openers:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()